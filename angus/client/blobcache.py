@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import collections
+import hashlib
+import sqlite3
+import threading
+import time
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+DEFAULT_TTL = 3600.0
+
+
+CHUNK_SIZE = 65536
+
+
+def digest(data):
+    """Return the content hash of bytes or of a buffer.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(fileobj, chunk_size=CHUNK_SIZE):
+    """Return the content hash of the rest of a file object, read by
+    chunks, and seek back to its position. Return None if the file cannot
+    seek.
+    """
+    try:
+        position = fileobj.tell()
+    except (AttributeError, EnvironmentError, ValueError):
+        return None
+    content = hashlib.sha256()
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        content.update(chunk)
+    fileobj.seek(position)
+    return content.hexdigest()
+
+
+class BlobCache(object):
+    """Endpoints of the blobs already uploaded, by content hash.
+
+    Entries are kept in a LRU in memory and, with a path, in a SQLite index
+    that survives restarts. Entries older than ttl are dropped, in case the
+    server expired the blob; invalidate drops one explicitly.
+
+    Arguments:
+    max_entries -- size of the memory LRU (default 1024)
+    ttl -- lifetime of an entry in seconds (default DEFAULT_TTL, None for
+    ever)
+    path -- path of the on-disk index (default None, memory only)
+    """
+
+    def __init__(self, max_entries=1024, ttl=DEFAULT_TTL, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute("CREATE TABLE IF NOT EXISTS blobs ("
+                                 "digest TEXT PRIMARY KEY, endpoint TEXT, "
+                                 "created REAL)")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        """Return the endpoint of the blob key, None if unknown or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None and self._db is not None:
+                entry = self._db.execute(
+                    "SELECT endpoint, created FROM blobs WHERE digest = ?",
+                    (key,)).fetchone()
+            if entry is None or self._expired(entry[1], now):
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+            self._entries[key] = tuple(entry)
+            self._trim()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, endpoint):
+        """Record the endpoint of the blob key.
+        """
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (endpoint, now)
+            self._trim()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)",
+                        (key, endpoint, now))
+
+    def invalidate(self, key):
+        """Forget the blob key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._delete(key)
+
+    def clear(self):
+        """Forget all the blobs.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM blobs")
+
+    def _delete(self, key):
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM blobs WHERE digest = ?", (key,))
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -17,10 +17,19 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import concurrent.futures
 import copy
+import io
 import json
+import logging
+import threading
+import time
+
 import six
+from six.moves import queue
 
+from angus.client import blobcache
+from angus.client import codec
 from angus.client import rest
 import angus
 
@@ -32,30 +41,176 @@ __license__ = "Apache v2.0"
 __maintainer__ = "Aurélien Moreau"
 __status__ = "Production"
 
+LOGGER = logging.getLogger('AngusSDK')
+
 class BlobDirectory(rest.Collection):
     """ Store binary data.
+
+    With a blob cache on the configuration, see
+    Configuration.set_blob_cache, a content already uploaded is not sent
+    again and its blob is returned.
     """
     def create(self, binary):
-        return super(BlobDirectory, self).create(
+        return self.create_async(binary).result()
+
+    def create_async(self, binary):
+        """ Upload binary data on the configuration executor, return a
+        future of the blob.
+        """
+        cache = getattr(self.conf, "blob_cache", None)
+        if cache is None:
+            return self.upload_async(binary)
+
+        if isinstance(binary, rest.MappedFile):
+            key = blobcache.digest(binary.view())
+        else:
+            key = blobcache.file_digest(binary)
+            if key is None:
+                # Not seekable, hashed from memory
+                content = binary.read()
+                key = blobcache.digest(content)
+                binary = io.BytesIO(content)
+
+        endpoint = cache.get(key)
+        if endpoint is not None:
+            future = concurrent.futures.Future()
+            future.set_result(
+                rest.Resource(self.endpoint, endpoint, conf=self.conf))
+            return future
+
+        future = self.upload_async(binary)
+
+        def cached(future):
+            try:
+                blob = future.result()
+            except Exception:
+                # Reported to the caller of the future
+                return
+            cache.put(key, blob.endpoint)
+
+        future.add_done_callback(cached)
+        return future
+
+    def upload_async(self, binary):
+        """ Upload binary data, return a future of the new blob.
+        """
+        return super(BlobDirectory, self).create_async(
             parameters={'content': binary})
 
 
 def generate_encoder(root):
     """ Replace binary data in python data structure by uploading
     it as a blob in Angus.ai cloud and set an endpoint.
+
+    The blobs are uploaded concurrently before the structure is encoded.
     """
     class Encoder(json.JSONEncoder):
 
+        def encode(self, o):
+            uploads = {}
+            json.dumps(o, default=generate_collector(root, uploads))
+            self.replace = generate_default(root, uploads)
+            return super(Encoder, self).encode(o)
+
         def default(self, o):
-            if isinstance(o, rest.Resource):
-                return o.endpoint
-            if hasattr(o, 'read'):
-                res = root.blobs.create(o)
-                return res.endpoint
-            return json.JSONEncoder.default(self, o)
+            return self.replace(o)
     return Encoder
 
 
+def generate_collector(root, uploads):
+    """ Generate the default function of a first encoding pass that starts
+    the upload of each binary data, uploads maps the id of the binary data
+    to the future of its blob.
+    """
+    def default(o):
+        if isinstance(o, rest.Resource):
+            return o.endpoint
+        if isinstance(o, rest.MappedFile) or hasattr(o, 'read'):
+            if id(o) not in uploads:
+                uploads[id(o)] = root.blobs.create_async(o)
+            return ""
+        raise TypeError("Object of type %s is not JSON serializable" % (
+            type(o).__name__))
+    return default
+
+
+def generate_default(root, uploads=None):
+    """ Generate the default function of a JSON codec that uploads
+    binary data as blobs, see generate_encoder.
+
+    With uploads, filled by generate_collector, the endpoints of the
+    blobs already uploading are used.
+    """
+    def default(o):
+        if isinstance(o, rest.Resource):
+            return o.endpoint
+        if isinstance(o, rest.MappedFile) or hasattr(o, 'read'):
+            if uploads is None:
+                return root.blobs.create(o).endpoint
+            return uploads[id(o)].result().endpoint
+        raise TypeError("Object of type %s is not JSON serializable" % (
+            type(o).__name__))
+    return default
+
+
+def encode_blobs(root, obj, json_codec):
+    """ Encode obj with json_codec, its binary data being uploaded
+    concurrently as blobs.
+    """
+    return encode_blobs_async(root, obj, json_codec).result()
+
+
+def encode_blobs_async(root, obj, json_codec):
+    """ Start the upload of the binary data of obj as blobs, return a
+    future of obj encoded with json_codec once they are uploaded.
+    """
+    uploads = {}
+    json_codec.dumps(obj, default=generate_collector(root, uploads))
+    encoded = concurrent.futures.Future()
+    remaining = [len(uploads)]
+    lock = threading.Lock()
+
+    def encode():
+        try:
+            encoded.set_result(json_codec.dumps(
+                obj, default=generate_default(root, uploads)))
+        except Exception as err:
+            encoded.set_exception(err)
+
+    def uploaded(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        encode()
+
+    if not uploads:
+        encode()
+    for future in list(uploads.values()):
+        future.add_done_callback(uploaded)
+    return encoded
+
+
+def chain(source, target):
+    """ Resolve the future target with the outcome of the future source,
+    cancel source along with target.
+    """
+    def cancel(_):
+        if target.cancelled():
+            source.cancel()
+
+    def resolve(_):
+        if target.done():
+            return
+        try:
+            target.set_result(source.result())
+        except Exception as err:
+            target.set_exception(err)
+
+    target.add_done_callback(cancel)
+    source.add_done_callback(resolve)
+
+
 class CompositeService(rest.Resource):
     """ Call several services as if it were only one.
     """
@@ -67,52 +222,186 @@ class CompositeService(rest.Resource):
         self.default_session = None
         self.session_parameters = None
 
-    def process(self, parameters, session=None):
+    def process(self, parameters, session=None, priority=None, timeout=None,
+                deadline=None):
         """Create a job configurate with
 
         Arguments:
         parameters -- the job parameter (default {})
         session -- a session object (default None)
-        """
-        if parameters is None:
-            parameters = {}
-        else:
-            parameters = copy.copy(parameters)
-
-        if self.session_parameters is not None:
-            parameters.update(self.session_parameters)
-
-        if session is None:
-            session = self.default_session
+        priority -- the scheduler lane of the requests (default None, normal)
+        timeout -- seconds to wait for each service, a number or a dict by
+        service name (default None, no limit)
+        deadline -- seconds to wait for all the services (default None)
 
-        if session is not None:
-            parameters['state'] = session.state()
-
-        attachments = []
+        The services that failed or did not answer in time are listed in the
+        'missing' field of the result.
+        """
+        return self.merge(self.iter_results(parameters, session, timeout,
+                                            deadline, priority))
 
-        data = json.dumps(parameters, cls=generate_encoder(self.root))
+    def process_async(self, parameters, session=None, priority=None,
+                      timeout=None, deadline=None):
+        """Create a job asynchronously, see process.
 
-        futures = []
-        for name, service in six.iteritems(self.services):
-            if attachments:
-                files = attachments + \
-                    [('meta', (None, data, 'application/json'))]
-                resp = self.conf.post(service.jobs.endpoint, files=files)
-            else:
-                headers = {'content-type': 'application/json'}
-                resp = self.conf.post(
-                    service.jobs.endpoint,
-                    data=data,
-                    headers=headers)
-            futures.append((name, resp))
+        Returns a Future object of the merged job, resolved by the last
+        service to answer or by the configuration timer when the time is
+        up. The blobs are uploaded and the jobs sent in the background.
+        """
+        start = time.time()
+        futures = self.submit(parameters, session, priority)
+        merged = concurrent.futures.Future()
+        pending = dict(futures)
+        results = []
+        lock = threading.Lock()
+
+        def settle(name, value):
+            with lock:
+                if pending.pop(name, None) is None:
+                    # Already answered or timed out
+                    return
+                results.append((name, value))
+                if pending:
+                    return
+            try:
+                merged.set_result(self.merge(results))
+            except Exception as err:
+                merged.set_exception(err)
+
+        def expire(name, future):
+            settle(name, concurrent.futures.TimeoutError(
+                "No result from %s in time" % (name)))
+            future.cancel()
+
+        for name, future in futures:
+            expires = self._expires(name, start, timeout, deadline)
+            if expires is not None:
+                self.conf.timer.call_at(
+                    expires, lambda name=name, future=future:
+                    expire(name, future))
+            future.add_done_callback(
+                lambda future, name=name: settle(name, self._decode(future)))
+        if not futures:
+            merged.set_result(self.merge([]))
+        return merged
+
+    def iter_results(self, parameters, session=None, timeout=None,
+                     deadline=None, priority=None):
+        """Send the job to all the services, return an iterator of
+        (service name, result) in completion order.
+
+        The result is the job representation, or the exception of a service
+        that failed, or a concurrent.futures.TimeoutError for a service
+        that did not answer within its timeout or the deadline. The
+        requests are sent before the iteration starts.
 
+        Arguments:
+        see process
+        """
+        start = time.time()
+        futures = self.submit(parameters, session, priority)
+        return self._iter_results(futures, start, timeout, deadline)
+
+    def submit(self, parameters, session=None, priority=None):
+        """Send the job to all the services once its blobs are uploaded,
+        without waiting, return a list of (service name, future of the
+        response). The request of a future cancelled meanwhile is not sent.
+        """
+        parameters = rest.job_parameters(self, parameters, session)
+
+        encoded = encode_blobs_async(self.root, parameters,
+                                     codec.of(self.conf))
+        futures = [(name, concurrent.futures.Future())
+                   for name in self.services]
+
+        def send(encoded):
+            for name, future in futures:
+                if future.cancelled():
+                    continue
+                try:
+                    headers = {'content-type': 'application/json'}
+                    resp = self.conf.post(
+                        self.services[name].jobs.endpoint,
+                        data=encoded.result(),
+                        headers=headers,
+                        priority=priority)
+                except Exception as err:
+                    if not future.done():
+                        future.set_exception(err)
+                    continue
+                chain(resp, future)
+
+        encoded.add_done_callback(send)
+        return futures
+
+    def _iter_results(self, futures, start, timeout, deadline):
+        done = queue.Queue()
+        pending = {}
+        expires = {}
+        for name, future in futures:
+            expires[name] = self._expires(name, start, timeout, deadline)
+            pending[name] = future
+            future.add_done_callback(
+                lambda future, name=name: done.put((name, future)))
+
+        while pending:
+            limits = [expires[name] for name in pending
+                      if expires[name] is not None]
+            wait = max(min(limits) - time.time(), 0) if limits else None
+            try:
+                name, future = done.get(timeout=wait)
+            except queue.Empty:
+                now = time.time()
+                for name in sorted(pending):
+                    if expires[name] is not None and expires[name] <= now:
+                        pending.pop(name).cancel()
+                        yield name, concurrent.futures.TimeoutError(
+                            "No result from %s in time" % (name))
+                continue
+
+            if pending.pop(name, None) is None:
+                # Already timed out
+                continue
+            yield name, self._decode(future)
+
+    @staticmethod
+    def _expires(name, start, timeout, deadline):
+        """Return the time after which the service name is given up, None
+        if there is no limit.
+        """
+        limits = [start + limit for limit in (
+            timeout.get(name) if isinstance(timeout, dict) else timeout,
+            deadline) if limit is not None]
+        return min(limits) if limits else None
+
+    def _decode(self, future):
+        """Return the job representation of a response future, or the
+        exception of a failed request.
+        """
+        try:
+            resp = future.result()
+            resp.raise_for_status()
+            return codec.of(self.conf).loads(resp.content)
+        except Exception as err:
+            return err
+
+    def merge(self, results):
+        """Return the job merging the (service name, result) of
+        iter_results, the failed services are listed in its 'missing'
+        field.
+        """
         result = {}
-        for (name, resp) in futures:
-            resp = resp.result()
-            if resp.status_code < 400:
-                result[name] = resp.json()
+        missing = []
+        for name, value in results:
+            if isinstance(value, Exception):
+                LOGGER.warning("No result from %s: %s", name, value)
+                missing.append(name)
+            else:
+                result[name] = value
 
         result["status"] = 200
+        if missing:
+            result["missing"] = sorted(missing)
 
         job = rest.Job(
             self.endpoint, "", representation=result, conf=self.conf)
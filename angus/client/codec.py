@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import rapidjson
+except ImportError:
+    rapidjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+AUTO = "auto"
+
+# A JSON string, or an object or array delimiter
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]')
+
+KEY_END = re.compile(r'\s*:\s*')
+
+DECODER = json.JSONDecoder()
+
+
+class JsonCodec(object):
+    """JSON encoding and decoding with the standard library.
+
+    dumps returns text, loads accepts text or UTF-8 bytes. The default
+    function of dumps replaces the objects the codec cannot serialize
+    (attachments, resources).
+    """
+
+    name = "json"
+    module = json
+
+    def dumps(self, obj, default=None):
+        return json.dumps(obj, default=default)
+
+    def loads(self, data):
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode("utf-8")
+        return json.loads(data)
+
+    def __repr__(self):
+        return "<%s codec>" % (self.name)
+
+
+class OrjsonCodec(JsonCodec):
+    """JSON with orjson, which encodes to bytes and decodes bytes directly.
+    """
+
+    name = "orjson"
+    module = orjson
+
+    def dumps(self, obj, default=None):
+        return orjson.dumps(obj, default=default).decode("utf-8")
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class RapidjsonCodec(JsonCodec):
+    """JSON with python-rapidjson.
+    """
+
+    name = "rapidjson"
+    module = rapidjson
+
+    def dumps(self, obj, default=None):
+        # Only lists and tuples as arrays, files are iterable attachments
+        return rapidjson.dumps(obj, default=default,
+                               iterable_mode=rapidjson.IM_ONLY_LISTS)
+
+    def loads(self, data):
+        return rapidjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """JSON with ujson (5.0 or later for the default function).
+    """
+
+    name = "ujson"
+    module = ujson
+
+    def dumps(self, obj, default=None):
+        if default is None:
+            return ujson.dumps(obj)
+        return ujson.dumps(obj, default=default)
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+# By decreasing speed, AUTO picks the first installed one
+CODECS = (OrjsonCodec, RapidjsonCodec, UjsonCodec, JsonCodec)
+
+STDLIB = JsonCodec()
+
+
+def of(conf):
+    """Return the codec of a configuration, the standard library one
+    without configuration.
+    """
+    return getattr(conf, "json_codec", None) or STDLIB
+
+
+def available():
+    """Return the names of the installed codecs.
+    """
+    return [codec.name for codec in CODECS if codec.module is not None]
+
+
+def get_codec(name=AUTO):
+    """Return the codec name, or with AUTO the fastest installed one.
+    """
+    for codec in CODECS:
+        if codec.module is None:
+            continue
+        if name in (AUTO, codec.name):
+            return codec()
+    if name in [codec.name for codec in CODECS]:
+        raise ImportError("JSON codec '%s' is not installed" % (name))
+    raise ValueError("Unknown JSON codec '%s'" % (name))
+
+
+def extract(data, names):
+    """Return a dict of the top level fields names of the JSON object data
+    (text or UTF-8 bytes), only these fields are decoded and the scan stops
+    once they are all found.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    wanted = set(names)
+    found = {}
+    depth = 0
+    for match in TOKEN.finditer(data):
+        token = match.group()
+        if token in ("{", "["):
+            depth += 1
+        elif token in ("}", "]"):
+            depth -= 1
+        elif depth == 1:
+            key_end = KEY_END.match(data, match.end())
+            if key_end is None:
+                continue
+            name = json.loads(token)
+            if name in wanted:
+                found[name], _ = DECODER.raw_decode(data, key_end.end())
+                if len(found) == len(wanted):
+                    break
+    return found
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import collections
+import threading
+import time
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+LATEST = "latest"
+
+POLICIES = (BLOCK, DROP_OLDEST, LATEST)
+
+
+class FrameWindow(object):
+    """A bounded window of frames between a producer and a stream input.
+
+    The window counts the frames waiting to be sent and the frames sent
+    but not yet answered (in flight). When it is full, the policy decides:
+
+    BLOCK -- the producer waits for a free slot
+    DROP_OLDEST -- the oldest waiting frame is dropped
+    LATEST -- only the latest frame is kept waiting
+
+    Arguments:
+    size -- maximum number of frames in the window
+    policy -- one of BLOCK, DROP_OLDEST, LATEST (default BLOCK)
+    timeout -- seconds after which an unanswered frame leaves the window
+    (default None, never)
+    """
+
+    def __init__(self, size, policy=BLOCK, timeout=None):
+        if size < 1:
+            raise ValueError("Window size must be at least 1")
+        if policy not in POLICIES:
+            raise ValueError("Unknown window policy '%s'" % (policy))
+
+        self.size = size
+        self.policy = policy
+        self.timeout = timeout
+        self.dropped = 0
+        self.expired = 0
+        self._waiting = collections.deque()
+        self._in_flight = collections.deque()
+        self._closed = False
+        self._aborted = False
+        self._cond = threading.Condition()
+
+    @property
+    def pending(self):
+        """Number of frames waiting to be sent.
+        """
+        return len(self._waiting)
+
+    @property
+    def in_flight(self):
+        """Number of frames sent and not yet answered.
+        """
+        return len(self._in_flight)
+
+    def __len__(self):
+        return len(self._waiting) + len(self._in_flight)
+
+    def put(self, frame):
+        """Add a frame from the producer, return False if the frame was
+        dropped.
+        """
+        with self._cond:
+            if self.policy == LATEST:
+                self.dropped += len(self._waiting)
+                self._waiting.clear()
+            else:
+                self._expire(time.time())
+                while len(self) >= self.size and not self._aborted:
+                    if self.policy == BLOCK:
+                        self._wait()
+                    elif self._waiting:
+                        self._waiting.popleft()
+                        self.dropped += 1
+                    else:
+                        self.dropped += 1
+                        return False
+
+            if self._aborted:
+                return False
+
+            self._waiting.append(frame)
+            self._cond.notify_all()
+            return True
+
+    def get(self):
+        """Wait for a frame that can be sent and mark it in flight.
+        Return None once the window is closed and drained.
+        """
+        with self._cond:
+            while not self._aborted:
+                if self._waiting and len(self._in_flight) < self.size:
+                    frame = self._waiting.popleft()
+                    self._in_flight.append(time.time())
+                    self._cond.notify_all()
+                    return frame
+                if self._closed and not self._waiting:
+                    return None
+                self._wait()
+            return None
+
+    def poll(self):
+        """Return a frame that can be sent now and mark it in flight, None
+        if there is none.
+        """
+        with self._cond:
+            now = time.time()
+            self._expire(now)
+            if self._waiting and len(self._in_flight) < self.size:
+                frame = self._waiting.popleft()
+                self._in_flight.append(now)
+                self._cond.notify_all()
+                return frame
+            return None
+
+    @property
+    def finished(self):
+        """True when the window is closed and all its frames are sent.
+        """
+        return self._aborted or (self._closed and not self._waiting)
+
+    def release(self, count=1):
+        """Acknowledge the oldest in flight frames.
+        """
+        with self._cond:
+            for _ in range(min(count, len(self._in_flight))):
+                self._in_flight.popleft()
+            self._cond.notify_all()
+
+    def reset(self):
+        """Forget the in flight frames, when their results are lost.
+        """
+        with self._cond:
+            self._in_flight.clear()
+            self._cond.notify_all()
+
+    def frames(self):
+        """Generator of the frames to send.
+        """
+        while True:
+            frame = self.get()
+            if frame is None:
+                return
+            yield frame
+
+    def feed(self, data):
+        """Push all frames of the data generator then close the window,
+        blocking call usually run in its own thread.
+        """
+        try:
+            for frame in data:
+                self.put(frame)
+                if self._aborted:
+                    break
+        finally:
+            self.close()
+
+    def close(self):
+        """No more frame will be produced.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """Stop the window, unblock producer and consumer.
+        """
+        with self._cond:
+            self._aborted = True
+            self._waiting.clear()
+            self._cond.notify_all()
+
+    def _wait(self):
+        """Wait for a change, expiring in flight frames older than the
+        timeout. Must be called with the condition held.
+        """
+        if self.timeout is None:
+            self._cond.wait()
+            return
+
+        now = time.time()
+        if self._expire(now):
+            self._cond.notify_all()
+        elif self._in_flight:
+            self._cond.wait(self.timeout - (now - self._in_flight[0]))
+        else:
+            self._cond.wait(self.timeout)
+
+    def _expire(self, now):
+        """Drop the in flight frames older than the timeout, return True if
+        any. Must be called with the condition held.
+        """
+        if self.timeout is None:
+            return False
+        expired = self.expired
+        while self._in_flight and now - self._in_flight[0] >= self.timeout:
+            self._in_flight.popleft()
+            self.expired += 1
+        return self.expired != expired
+
+
+class RateController(object):
+    """Adapt the rate at which frames or jobs are sent to keep the result
+    latency close to a target: the rate grows linearly while the latency
+    and the queue depth are low, and is cut down as soon as they are not.
+
+    Frames from a generator are paced with wrap, calls to process_async
+    with submit, both feed the controller. Stream results are fed to the
+    controller given to Service.stream.
+
+    Arguments:
+    target -- target latency in seconds
+    rate -- initial rate in frames per second (default 5)
+    min_rate -- lowest rate (default 0.5)
+    max_rate -- highest rate (default 30)
+    max_queue -- queue depth above which the rate is reduced (default 2)
+    step -- rate increase per observation on target (default 0.25)
+    decrease -- factor applied to the rate above target (default 0.7)
+    """
+
+    # Weight of a new latency in the smoothed latency
+    SMOOTHING = 0.2
+
+    def __init__(self, target, rate=5.0, min_rate=0.5, max_rate=30.0,
+                 max_queue=2, step=0.25, decrease=0.7):
+        self.target = target
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_queue = max_queue
+        self.step = step
+        self.decrease = decrease
+        self.latency = None
+        self.skipped = 0
+        self._pending = 0
+        self._next = 0
+        self._last_decrease = 0
+        self._lock = threading.Lock()
+
+    def observe(self, latency, queue=None):
+        """Record the latency of a result and the current queue depth,
+        adjust the rate.
+        """
+        now = time.time()
+        with self._lock:
+            if queue is None:
+                queue = self._pending
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.SMOOTHING * (latency - self.latency)
+
+            if self.latency > self.target or queue > self.max_queue:
+                # Results already in flight still show the old rate, wait
+                # for one latency before cutting again
+                if now - self._last_decrease >= self.latency:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.rate = min(self.max_rate, self.rate + self.step)
+
+    def ready(self):
+        """Return True and take the slot if a frame can be sent now.
+        """
+        now = time.time()
+        with self._lock:
+            if now < self._next:
+                return False
+            self._next = max(self._next, now) + 1.0 / self.rate
+            return True
+
+    def wait(self):
+        """Wait for the next sending slot.
+        """
+        while True:
+            with self._lock:
+                delay = self._next - time.time()
+            if delay <= 0 and self.ready():
+                return
+            time.sleep(max(delay, 0))
+
+    def wrap(self, data, drop=True):
+        """Pace a frame generator. Frames arriving too early are skipped
+        (live sources) or delayed when drop is False (recorded sources).
+        """
+        for frame in data:
+            if drop:
+                if not self.ready():
+                    self.skipped += 1
+                    continue
+            else:
+                self.wait()
+            yield frame
+
+    def track(self, future):
+        """Observe the latency of a future, e.g. from process_async.
+        """
+        start = time.time()
+        with self._lock:
+            self._pending += 1
+
+        def done(_):
+            with self._lock:
+                self._pending -= 1
+            self.observe(time.time() - start)
+
+        future.add_done_callback(done)
+        return future
+
+    def submit(self, fn, *args, **kwargs):
+        """Wait for a sending slot, call fn (e.g. service.process_async)
+        and track the returned future.
+        """
+        self.wait()
+        return self.track(fn(*args, **kwargs))
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import collections
+import concurrent.futures
+import io
+import threading
+import time
+
+import six
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+# Frames sent by MotionGate.wrap remembered for MotionGate.replay
+REPLAY_SIZE = 256
+
+# Result fields holding image coordinates or sizes, lists of alternating x
+# and y
+COORDINATE_KEYS = frozenset([
+    "roi", "face_roi", "body_roi", "eye_left", "eye_right", "nose", "mouth",
+    "face_eye", "face_mouth", "face_nose", "center", "input_size",
+])
+
+
+def require(module, name):
+    """Raise an explicit error when an optional dependency is missing.
+    """
+    if module is None:
+        raise ImportError("This feature requires %s, please install it "
+                          "(pip install %s)" % (name, name))
+
+
+def read_image(image):
+    """Return the encoded bytes of an image given as bytes, buffer or
+    file-like object, the position of a file is left unchanged.
+    """
+    if hasattr(image, "read"):
+        position = image.tell() if hasattr(image, "seek") else None
+        data = image.read()
+        if position is not None:
+            image.seek(position)
+        return data
+    return image
+
+
+def signature(frame, size=(16, 16)):
+    """Compute a cheap signature of a frame: a small grayscale thumbnail
+    as a float array.
+
+    Arguments:
+    frame -- a NumPy array of pixels (height, width[, channels]) or an
+    encoded image (bytes, buffer such as a 1-D array, or file-like object),
+    decoded with Pillow
+    size -- (width, height) of the thumbnail
+    """
+    require(numpy, "numpy")
+    if isinstance(frame, numpy.ndarray) and frame.ndim >= 2:
+        pixels = frame
+        if pixels.ndim == 3:
+            pixels = pixels.mean(axis=2)
+        step_y = max(pixels.shape[0] // size[1], 1)
+        step_x = max(pixels.shape[1] // size[0], 1)
+        return pixels[::step_y, ::step_x][:size[1], :size[0]].astype(
+            numpy.float32)
+
+    require(Image, "Pillow")
+    image = Image.open(io.BytesIO(bytes(read_image(frame))))
+    # JPEG can be decoded directly at a reduced scale
+    image.draft("L", (size[0] * 8, size[1] * 8))
+    image = image.convert("L").resize(size)
+    return numpy.asarray(image, dtype=numpy.float32)
+
+
+class MotionGate(object):
+    """Skip frames that are nearly the same as the last frame sent.
+
+    A frame is sent if the mean absolute difference between its signature
+    and the one of the last frame sent is above the threshold, or if
+    nothing was sent for interval seconds.
+
+    process returns the last result again for a skipped frame. On a
+    stream, filter the frames with wrap and read the results through
+    replay, which yields the last result again for each skipped frame.
+
+    Arguments:
+    threshold -- change between 0 and 1 (mean difference of gray levels)
+    above which a frame is sent (default 0.02)
+    interval -- maximum delay in seconds between two frames sent
+    (default 5)
+    size -- (width, height) of the frame signature (default (16, 16))
+    """
+
+    def __init__(self, threshold=0.02, interval=5.0, size=(16, 16)):
+        require(numpy, "numpy")
+        self.threshold = threshold
+        self.interval = interval
+        self.size = size
+        self.sent = 0
+        self.skipped = 0
+        self.last_result = None
+        self._reference = None
+        # (parameters, frames skipped before) of the frames sent by wrap
+        self._sent = collections.deque(maxlen=REPLAY_SIZE)
+        self._gated = 0
+        self._sent_at = 0
+        self._lock = threading.Lock()
+
+    def check(self, frame):
+        """Return True if the frame must be sent, it becomes the new
+        reference.
+        """
+        current = signature(frame, self.size)
+        now = time.time()
+        with self._lock:
+            reference = self._reference
+            if (reference is None or reference.shape != current.shape or
+                    now - self._sent_at >= self.interval or
+                    numpy.abs(current - reference).mean() / 255.0 >
+                    self.threshold):
+                self._reference = current
+                self._sent_at = now
+                self.sent += 1
+                return True
+            self.skipped += 1
+            return False
+
+    def wrap(self, data):
+        """Filter a stream frame generator of (parameters, field, data).
+        """
+        for frame in data:
+            if self.check(frame[2]):
+                with self._lock:
+                    self._sent.append((frame[0], self._gated))
+                    self._gated = 0
+                yield frame
+            else:
+                with self._lock:
+                    self._gated += 1
+
+    def replay(self, results):
+        """Filter the results of a stream fed by wrap: the last result is
+        yielded again for each frame skipped after its frame, when the
+        result of the next frame arrives or the stream ends. Results are
+        matched to their frame by their parameters (StreamResult).
+        """
+        last = None
+        for result in results:
+            gated = 0
+            parameters = getattr(result, "parameters", None)
+            with self._lock:
+                if any(sent is parameters for sent, _ in self._sent):
+                    while True:
+                        sent, count = self._sent.popleft()
+                        gated += count
+                        if sent is parameters:
+                            break
+            if last is not None:
+                for _ in range(gated):
+                    yield last
+            last = result
+            yield result
+
+        with self._lock:
+            gated = self._gated + sum(count for _, count in self._sent)
+            self._sent.clear()
+            self._gated = 0
+        if last is not None:
+            for _ in range(gated):
+                yield last
+
+    def process(self, service, parameters, field="image", **kwargs):
+        """Call service.process unless the frame in parameters[field] did not
+        change, in which case the last result is returned again.
+        """
+        if not self.check(parameters[field]) and self.last_result is not None:
+            return self.last_result
+        self.last_result = service.process(parameters, **kwargs)
+        return self.last_result
+
+
+class Preprocessor(object):
+    """Downscale and re-encode images before they are uploaded, on a pool
+    of workers, and map the coordinates of the results back to the
+    original resolution. Attachments that are not images, or are already
+    small enough, are sent unchanged.
+
+    Arguments:
+    max_size -- (width, height) the images are reduced to fit in
+    quality -- JPEG quality of the re-encoded images (default 85)
+    workers -- number of worker threads (default 2)
+    coordinates -- result fields to map back (default COORDINATE_KEYS)
+    """
+
+    def __init__(self, max_size=(640, 480), quality=85, workers=2,
+                 coordinates=COORDINATE_KEYS):
+        require(Image, "Pillow")
+        self.max_size = max_size
+        self.quality = quality
+        self.coordinates = coordinates
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+
+    def transform(self, image):
+        """Return the image to upload and its (x, y) scale.
+        """
+        data = read_image(image)
+        try:
+            img = Image.open(io.BytesIO(bytes(data)))
+            width, height = img.size
+        except (IOError, ValueError):
+            return image, None
+
+        ratio = min(float(self.max_size[0]) / width,
+                    float(self.max_size[1]) / height)
+        if ratio >= 1:
+            return image, None
+
+        size = (max(int(width * ratio), 1), max(int(height * ratio), 1))
+        img.draft("RGB", size)
+        img = img.convert("RGB").resize(size, Image.BILINEAR)
+        output = io.BytesIO()
+        img.save(output, "JPEG", quality=self.quality)
+        output.seek(0)
+        return output, (float(size[0]) / width, float(size[1]) / height)
+
+    def submit(self, image):
+        """Transform an image on the pool, return a future.
+        """
+        return self.executor.submit(self.transform, image)
+
+    def resolve(self, attachments):
+        """Wait for the attachments submitted by the encoder, return the
+        attachments to send and the scale of the first resized image.
+        """
+        scale = None
+        resolved = []
+        for field, (name, future, content_type) in attachments:
+            image, image_scale = future.result()
+            if scale is None:
+                scale = image_scale
+            resolved.append((field, (name, image, content_type)))
+        return resolved, scale
+
+    def restore(self, representation, scale):
+        """Map the coordinates of a result back to the original image,
+        integer coordinates stay integers.
+        """
+        if scale is None:
+            return representation
+        return self._restore(representation, scale, False)
+
+    def _restore(self, value, scale, coordinates):
+        if isinstance(value, dict):
+            return dict(
+                (key, self._restore(item, scale, key in self.coordinates))
+                for key, item in value.items())
+        if isinstance(value, list):
+            if coordinates and all(isinstance(item, (int, float))
+                                   for item in value):
+                return [self._scale(item, scale[index % 2])
+                        for index, item in enumerate(value)]
+            return [self._restore(item, scale, coordinates)
+                    for item in value]
+        return value
+
+    @staticmethod
+    def _scale(item, scale):
+        if isinstance(item, six.integer_types):
+            return int(round(item / scale))
+        return item / scale
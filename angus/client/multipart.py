@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import json
+import os
+import re
+import uuid
+
+import six
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+BOUNDARY = "myboundary"
+
+BREAK = b"\r\n"
+DBREAK = BREAK + BREAK
+
+# Consumed bytes are only dropped from the head of the buffer once they
+# exceed this size, so that the memmove cost is amortized over many parts.
+COMPACT_THRESHOLD = 65536
+
+# urllib3 before 2, used by requests 2.32 and later for chunked bodies,
+# only sends bytes or text chunks
+BYTES_CHUNKS = urllib3 is not None and \
+    int(urllib3.__version__.split(".")[0]) < 2
+
+MULTIPART_HEADER = {
+    "Content-Type": "multipart/x-mixed-replace; boundary=%s" % (BOUNDARY)
+}
+
+# Header of an input part, the separator ends the previous part
+PART_HEADER = ("%s--" + BOUNDARY + "\r\n"
+               "Content-Type: image/jpeg\r\n"
+               "Content-Length: %d\r\n"
+               "X-Angus-DataField: %s\r\n"
+               "X-Angus-Parameters: %s\r\n")
+
+SEQUENCE_HEADER = "X-Angus-Sequence: %d\r\n"
+
+# Header of a multipart/form-data part
+FORM_HEADER = ("--%s\r\n"
+               "Content-Disposition: form-data; name=\"%s\"%s\r\n")
+
+CONTENT_TYPE = "Content-Type: %s\r\n"
+
+ENCODER_CHUNK_SIZE = 65536
+
+HEADER_LINE = re.compile(br"^([^:\s]+)\s*:\s*(.*)$")
+
+
+def parse_headers(data):
+    """Parse a block of part header lines into a dict with lower case
+    names.
+    """
+    headers = {}
+    for line in bytes(data).split(BREAK):
+        match = HEADER_LINE.match(line)
+        if match is not None:
+            name = match.group(1).decode("latin-1").lower()
+            headers[name] = match.group(2).strip().decode("latin-1")
+    return headers
+
+
+class MultipartReader(object):
+    """Incremental reader of a multipart/x-mixed-replace stream.
+
+    Incoming bytes are appended to a bytearray and the reader keeps its
+    position between calls to feed, so each byte is scanned only once
+    whatever the size of the chunks read from the network. Part bodies are
+    skipped using their Content-Length and never searched for the boundary.
+    """
+
+    def __init__(self, boundary=BOUNDARY):
+        self.delimiter = b"--" + boundary.encode("ascii") + BREAK
+        self.buffer = bytearray()
+        self._position = 0
+        self._scan = 0
+        self._header = None
+        self._body = None
+        self._length = None
+        self._pending_headers = None
+
+    def feed(self, data):
+        """Append data to the stream and return the list of the parts
+        that are now complete, as (headers, body) with the headers in a dict
+        with lower case names and the body in bytes.
+        """
+        self.buffer.extend(data)
+        parts = []
+        while True:
+            if self._body is None and not self._read_header():
+                break
+
+            end = self._body + self._length
+            if len(self.buffer) < end:
+                break
+
+            parts.append((self._pending_headers,
+                          memoryview(self.buffer)[self._body:end].tobytes()))
+            self._position = self._scan = end
+            self._header = self._body = self._length = None
+
+        self._compact()
+        return parts
+
+    def _read_header(self):
+        """Look for the next complete part header, return True when found.
+        """
+        buf = self.buffer
+        if self._header is None:
+            start = buf.find(self.delimiter, self._scan)
+            if start == -1:
+                # Keep a tail in case the delimiter is split between reads
+                self._scan = max(self._position,
+                                 len(buf) - len(self.delimiter) + 1)
+                self._position = self._scan
+                return False
+            self._header = self._scan = start + len(self.delimiter)
+
+        end = buf.find(DBREAK, self._scan)
+        if end == -1:
+            self._scan = max(self._header, len(buf) - len(DBREAK) + 1)
+            return False
+
+        headers = parse_headers(buf[self._header:end])
+        if "content-length" not in headers:
+            raise ValueError("Missing Content-Length in multipart header")
+
+        self._pending_headers = headers
+        self._length = int(headers["content-length"])
+        self._body = end + len(DBREAK)
+        return True
+
+    def _compact(self):
+        """Drop consumed bytes from the head of the buffer.
+        """
+        offset = self._position
+        if offset == len(self.buffer):
+            del self.buffer[:]
+        elif offset < COMPACT_THRESHOLD:
+            return
+        else:
+            del self.buffer[:offset]
+
+        self._position = 0
+        self._scan -= offset
+        if self._header is not None:
+            self._header -= offset
+        if self._body is not None:
+            self._body -= offset
+
+
+def as_buffer(data):
+    """Return data as a flat buffer of bytes without copy, data can be any
+    object supporting the buffer protocol (bytes, bytearray, memoryview,
+    mmap, NumPy arrays...).
+    """
+    if isinstance(data, bytes):
+        return data
+
+    try:
+        view = memoryview(data)
+    except TypeError:
+        # Python 2 objects with the old buffer interface only (mmap)
+        return data
+    if not hasattr(view, "cast") or not view.c_contiguous:
+        # Python 2 views and non contiguous arrays must be copied
+        return view.tobytes()
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+def as_bytes(data):
+    """Return a buffer returned by as_buffer as bytes, copied if needed.
+    """
+    if isinstance(data, bytes):
+        return data
+    if hasattr(data, "tobytes"):
+        return data.tobytes()
+    # Python 2 objects with the old buffer interface only (mmap)
+    return data[:]
+
+
+def part_header(params, field, length, sequence=None, separator=""):
+    """Return the header of an input part, separator ends the previous
+    part.
+    """
+    header = PART_HEADER % (separator, length, field, json.dumps(params))
+    if sequence is not None:
+        header += SEQUENCE_HEADER % (sequence)
+    return (header + "\r\n").encode()
+
+
+def generate_parts(data, tracker=None):
+    """Generate parts for a multipart stream from the generator data.
+
+    The binary data of a frame is yielded as a buffer on the frame, only the
+    part header is built from PART_HEADER. With urllib3 before 2 (see
+    BYTES_CHUNKS) it is copied to bytes, as urllib3 rejects other buffers.
+    Either way the transport still copies each chunk it sends.
+
+    Arguments:
+    data -- generator that produces (data_parameters, data_field, data_bin),
+    data_bin being any object supporting the buffer protocol
+    tracker -- an object whose sent(data_parameters) method returns the
+    sequence id of each frame, sent in a X-Angus-Sequence header
+    (default None)
+    """
+    separator = ""
+    for params, field, part in data:
+        part = as_buffer(part)
+        if BYTES_CHUNKS:
+            part = as_bytes(part)
+        sequence = tracker.sent(params) if tracker is not None else None
+        yield part_header(params, field, len(part), sequence, separator)
+        yield part
+        separator = "\r\n"
+    yield closing_delimiter(separator)
+
+
+def closing_delimiter(separator=""):
+    """Return the end of a multipart stream.
+    """
+    return (separator + "--%s--" % (BOUNDARY)).encode()
+
+
+def file_size(fileobj):
+    """Return the number of bytes left to read in a file object, None if
+    it is unknown.
+    """
+    try:
+        return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+    except (AttributeError, EnvironmentError, ValueError):
+        pass
+    try:
+        position = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell() - position
+        fileobj.seek(position)
+        return size
+    except (AttributeError, EnvironmentError, ValueError):
+        return None
+
+
+class MultipartEncoder(object):
+    """A multipart/form-data body read on demand.
+
+    File objects are read chunk by chunk while the body is sent, and the
+    length of the body is known beforehand, so requests sends it with a
+    Content-Length. Files whose size is unknown are read when the encoder
+    is built.
+
+    Arguments:
+    fields -- list of (name, (filename, content, content_type)), as the
+    requests files argument, content being a file object, bytes or text
+    boundary -- the part boundary (default None, random)
+    chunk_size -- size of the chunks produced by iteration
+    (default ENCODER_CHUNK_SIZE)
+    """
+
+    def __init__(self, fields, boundary=None, chunk_size=ENCODER_CHUNK_SIZE):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = "multipart/form-data; boundary=%s" % (
+            self.boundary)
+        self.chunk_size = chunk_size
+
+        # (content, size, start), start is the file position or None
+        self._segments = []
+        for name, (filename, content, kind) in fields:
+            disposition = "" if filename is None else \
+                "; filename=\"%s\"" % (filename)
+            header = FORM_HEADER % (self.boundary, name, disposition)
+            if kind is not None:
+                header += CONTENT_TYPE % (kind)
+            self._add((header + "\r\n").encode("utf-8"))
+            if hasattr(content, "read"):
+                size = file_size(content)
+                if size is None:
+                    self._add(content.read())
+                elif size > 0:
+                    self._segments.append((content, size, content.tell()))
+            else:
+                if isinstance(content, six.text_type):
+                    content = content.encode("utf-8")
+                self._add(as_buffer(content))
+            self._add(BREAK)
+        self._add(("--%s--\r\n" % (self.boundary)).encode())
+
+        self.len = sum(size for _, size, _ in self._segments)
+        self._index = 0
+        self._offset = 0
+
+    def _add(self, data):
+        self._segments.append((data, len(data), None))
+
+    def __len__(self):
+        return self.len
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        """Read at most size bytes of the body, all of it if size is
+        negative.
+        """
+        if size is None or size < 0:
+            size = self.len
+        chunks = []
+        while size > 0 and self._index < len(self._segments):
+            content, length, start = self._segments[self._index]
+            count = min(size, length - self._offset)
+            if start is None:
+                chunk = content[self._offset:self._offset + count]
+            else:
+                chunk = content.read(count)
+                if not chunk and count > 0:
+                    raise IOError("File ended %d bytes before its announced "
+                                  "size" % (length - self._offset))
+            chunks.append(chunk)
+            size -= len(chunk)
+            self._offset += len(chunk)
+            if self._offset == length:
+                self._index += 1
+                self._offset = 0
+        return b"".join(chunks)
+
+    def rewind(self):
+        """Go back to the beginning of the body, return False if a file
+        cannot be rewound.
+        """
+        try:
+            for content, _, start in self._segments:
+                if start is not None:
+                    content.seek(start)
+        except (AttributeError, EnvironmentError, ValueError):
+            return False
+        self._index = 0
+        self._offset = 0
+        return True
@@ -0,0 +1,565 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import collections
+import errno
+import logging
+import os
+import select
+import socket
+import ssl
+import threading
+
+import requests
+from six.moves import queue
+from six.moves.urllib import parse as urlparse
+
+from angus.client import codec
+from angus.client import flow
+from angus.client.multipart import MULTIPART_HEADER, MultipartReader, \
+    as_buffer, closing_delimiter, part_header
+from angus.client.streaming import MIN_TIMEOUT_SAMPLES, FrameTracker, \
+    LatencyHistogram
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+LOGGER = logging.getLogger('AngusSDK')
+
+# Default bounds of each multiplexed stream
+DEFAULT_WINDOW = 4
+RESULT_QUEUE_SIZE = 100
+
+READ_SIZE = 65536
+
+# Period of the loop when nothing happens, to expire the frames without
+# result from the windows
+LOOP_TIMEOUT = 1.0
+
+INPUT_HEADERS = dict(MULTIPART_HEADER, **{"Transfer-Encoding": "chunked"})
+
+WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK)
+
+# Events reported by poll whatever the registered ones
+POLL_ERRORS = (getattr(select, "POLLERR", 0) | getattr(select, "POLLHUP", 0) |
+               getattr(select, "POLLNVAL", 0))
+
+
+def ssl_context(verify):
+    """Build a SSL context from the verify setting of a Configuration.
+    """
+    if verify is True:
+        return ssl.create_default_context()
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+    if os.path.isdir(verify):
+        return ssl.create_default_context(capath=verify)
+    return ssl.create_default_context(cafile=verify)
+
+
+def connect(conf, method, url, headers):
+    """Open a connection, send the head of a request and return the socket
+    in non blocking mode.
+    """
+    request = requests.Request(method, url, headers=headers,
+                               auth=conf.auth).prepare()
+    request.headers.pop("Content-Length", None)
+
+    location = urlparse.urlsplit(url)
+    secure = location.scheme == "https"
+    port = location.port or (443 if secure else 80)
+    sock = socket.create_connection((location.hostname, port),
+                                    timeout=conf.timeout)
+    if secure:
+        sock = ssl_context(conf.verify).wrap_socket(
+            sock, server_hostname=location.hostname)
+
+    lines = ["%s %s HTTP/1.1" % (method, request.path_url),
+             "Host: %s" % (location.netloc)]
+    lines.extend("%s: %s" % item for item in request.headers.items())
+    sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    sock.setblocking(False)
+    return sock
+
+
+def receive(sock):
+    """Read available data, return b"" at the end of the stream and None if
+    nothing can be read now.
+    """
+    try:
+        return sock.recv(READ_SIZE)
+    except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+        return None
+    except socket.error as err:
+        if err.errno in WOULD_BLOCK:
+            return None
+        raise
+
+
+def wait(readers, writers, timeout):
+    """Wait for sockets ready to read or write, return the sets of readable
+    and writable sockets. Uses poll where available, select cannot watch
+    descriptors above FD_SETSIZE (1024).
+    """
+    if not hasattr(select, "poll"):
+        readable, writable, _ = select.select(readers, writers, [], timeout)
+        return set(readable), set(writable)
+
+    events = collections.defaultdict(int)
+    sockets = {}
+    for sock in readers:
+        sockets[sock.fileno()] = sock
+        events[sock.fileno()] |= select.POLLIN
+    for sock in writers:
+        sockets[sock.fileno()] = sock
+        events[sock.fileno()] |= select.POLLOUT
+
+    poller = select.poll()
+    for fd, mask in events.items():
+        poller.register(fd, mask)
+
+    readable = set()
+    writable = set()
+    for fd, event in poller.poll(int(timeout * 1000)):
+        sock = sockets[fd]
+        # Errors and hang ups are reported by the next read or write
+        if event & (select.POLLIN | POLL_ERRORS):
+            readable.add(sock)
+        if event & (select.POLLOUT | POLL_ERRORS) and \
+                events[fd] & select.POLLOUT:
+            writable.add(sock)
+    return readable, writable
+
+
+def send(sock, data):
+    """Send as much data as possible, return the number of bytes sent.
+    """
+    try:
+        return sock.send(data)
+    except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+        return 0
+    except socket.error as err:
+        if err.errno in WOULD_BLOCK:
+            return 0
+        raise
+
+
+class ChunkedDecoder(object):
+    """Incremental decoder of a HTTP chunked body.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.done = False
+        self._remaining = None
+
+    def feed(self, data):
+        """Append data, return the list of the body fragments decoded.
+        """
+        buf = self.buffer
+        buf.extend(data)
+        fragments = []
+        while not self.done:
+            if self._remaining is None:
+                end = buf.find(b"\r\n")
+                if end == -1:
+                    break
+                self._remaining = int(bytes(buf[:end]).split(b";")[0], 16)
+                del buf[:end + 2]
+                if self._remaining == 0:
+                    self.done = True
+                    break
+
+            if self._remaining:
+                size = min(self._remaining, len(buf))
+                if size == 0:
+                    break
+                fragments.append(memoryview(buf)[:size].tobytes())
+                del buf[:size]
+                self._remaining -= size
+
+            if self._remaining == 0:
+                if len(buf) < 2:
+                    break
+                del buf[:2]
+                self._remaining = None
+        return fragments
+
+
+class MultiplexedStream(object):
+    """A stream driven by a StreamMultiplexer. Frames are pushed with send,
+    results are read from a bounded queue, the oldest result is discarded
+    when nobody reads it. Frames without result leave the window after
+    frame_timeout seconds, adapted to the latency when None.
+    """
+
+    def __init__(self, multiplexer, input_url, output_url,
+                 window=DEFAULT_WINDOW, policy=flow.DROP_OLDEST,
+                 queue_size=RESULT_QUEUE_SIZE, frame_timeout=None):
+        self.multiplexer = multiplexer
+        self.input_url = input_url
+        self.output_url = output_url
+        self.tracker = FrameTracker(codec.of(multiplexer.conf))
+        self.latency = LatencyHistogram()
+        self.frame_timeout = frame_timeout
+        self.window = flow.FrameWindow(
+            window, policy, frame_timeout or self.latency.frame_timeout())
+        self.results = queue.Queue(maxsize=queue_size)
+        self.discarded = 0
+        self.error = None
+        self.finished = False
+
+        self.input = None
+        self.output = None
+        self._pending = collections.deque()
+        self._separator = ""
+        self._input_done = False
+        self._head = bytearray()
+        self._decoder = None
+        self._reader = MultipartReader()
+
+    def send(self, parameters, field, data):
+        """Push a frame, return False if the window policy dropped it.
+        """
+        accepted = self.window.put((parameters, field, data))
+        self.multiplexer.wake()
+        return accepted
+
+    def close(self):
+        """No more frame will be sent, results still arrive.
+        """
+        self.window.close()
+        self.multiplexer.wake()
+
+    def get(self, block=True, timeout=None):
+        """Return the next result, None at the end of the stream.
+        """
+        result = self.results.get(block, timeout)
+        if result is None:
+            self._offer(None)
+        return result
+
+    def __iter__(self):
+        while True:
+            result = self.get()
+            if result is None:
+                return
+            yield result
+
+    @property
+    def writing(self):
+        """True when the input leg has data to write.
+        """
+        return bool(self._pending)
+
+    def fill(self):
+        """Encode the next frame that fits in the window. Called by the
+        loop.
+        """
+        if self.input is None or self._input_done or self._pending:
+            return
+
+        frame = self.window.poll()
+        if frame is not None:
+            params, field, data = frame
+            data = as_buffer(data)
+            header = part_header(params, field, len(data),
+                                 self.tracker.sent(params), self._separator)
+            size = ("%x\r\n" % (len(header) + len(data))).encode()
+            self._pending.extend([size + header, data, b"\r\n"])
+            self._separator = "\r\n"
+        elif self.window.finished:
+            end = closing_delimiter(self._separator)
+            self._pending.append(
+                ("%x\r\n" % len(end)).encode() + end + b"\r\n0\r\n\r\n")
+            self._input_done = True
+
+    def write_input(self):
+        """Send pending data on the input leg. Called by the loop.
+        """
+        while self._pending:
+            data = self._pending[0]
+            count = send(self.input, data)
+            if count == 0:
+                return
+            if count < len(data):
+                self._pending[0] = memoryview(data)[count:]
+                return
+            self._pending.popleft()
+
+    def read_input(self):
+        """Read the response of the input leg. Called by the loop.
+        """
+        while self.input is not None:
+            data = receive(self.input)
+            if data is None:
+                return
+            if not data:
+                self.input.close()
+                self.input = None
+                if not self._input_done:
+                    self.finish("input closed by server")
+
+    def read_output(self):
+        """Read and parse the results of the output leg. Called by the loop.
+        """
+        while self.output is not None:
+            data = receive(self.output)
+            if data is None:
+                return
+            if not data:
+                self.finish()
+                return
+            self._parse(data)
+
+    def finish(self, error=None):
+        """Close both legs and mark the end of the results.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        self.error = error
+        if error is not None:
+            LOGGER.error("Multiplexed stream ended: %s", error)
+        for sock in (self.input, self.output):
+            if sock is not None:
+                sock.close()
+        self.input = self.output = None
+        self.window.abort()
+        self._offer(None)
+
+    def _parse(self, data):
+        if self._decoder is None:
+            self._head.extend(data)
+            end = self._head.find(b"\r\n\r\n")
+            if end == -1:
+                return
+            head = bytes(self._head[:end]).decode("latin-1").split("\r\n")
+            data = bytes(self._head[end + 4:])
+            self._head = None
+
+            status = int(head[0].split()[1])
+            if status >= 400:
+                self.finish("output HTTP %d" % (status))
+                return
+            headers = [line.lower().replace(" ", "") for line in head[1:]]
+            if "transfer-encoding:chunked" in headers:
+                self._decoder = ChunkedDecoder()
+            else:
+                self._decoder = False
+
+        if self._decoder:
+            fragments = self._decoder.feed(data)
+        else:
+            fragments = [data]
+
+        for fragment in fragments:
+            for headers, part in self._reader.feed(fragment):
+                result = self.tracker.received(part, headers)
+                if result.latency is not None:
+                    self.latency.add(result.latency)
+                self.window.release(1 + len(result.skipped))
+                if self.frame_timeout is None and \
+                        self.latency.count % MIN_TIMEOUT_SAMPLES == 0:
+                    self.window.timeout = self.latency.frame_timeout()
+                self._offer(result)
+
+        if self._decoder and self._decoder.done:
+            self.finish()
+
+    def _offer(self, result):
+        """Queue a result, discarding the oldest one if the queue is full.
+        """
+        while True:
+            try:
+                self.results.put_nowait(result)
+                return
+            except queue.Full:
+                try:
+                    self.results.get_nowait()
+                    self.discarded += 1
+                except queue.Empty:
+                    pass
+
+
+class StreamMultiplexer(object):
+    """Drive the input and output legs of many streams from a single
+    thread with non blocking sockets, instead of a thread per leg.
+
+    Arguments:
+    conf -- the Configuration object
+    queue_size -- bound of the result queue of each stream
+    """
+
+    def __init__(self, conf, queue_size=RESULT_QUEUE_SIZE):
+        self.conf = conf
+        self.queue_size = queue_size
+        self.streams = []
+        self._added = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        # Socket pair waking the loop up, open while the loop runs
+        self._wake_recv = self._wake_send = None
+
+    def open(self, service, parameters=None, session=None,
+             window=DEFAULT_WINDOW, policy=flow.DROP_OLDEST,
+             frame_timeout=None):
+        """Create a stream on a service and add it to the loop.
+
+        Arguments:
+        service -- a rest.Service
+        parameters -- parameter for stream creation (default {})
+        session -- a session object (default None)
+        window -- maximum number of frames waiting or in flight
+        policy -- what to do when the window is full, see flow.FrameWindow
+        frame_timeout -- seconds after which a frame without result leaves
+        the window (default None, adapted to the latency)
+
+        Returns a MultiplexedStream
+        """
+        job = service.open_stream(parameters, session)
+        stream = MultiplexedStream(self, job.result["input"],
+                                   job.result["output"], window=window,
+                                   policy=policy, queue_size=self.queue_size,
+                                   frame_timeout=frame_timeout)
+        stream.input = connect(self.conf, "POST", stream.input_url,
+                               INPUT_HEADERS)
+        stream.output = connect(self.conf, "GET", stream.output_url, {})
+
+        with self._lock:
+            self._added.append(stream)
+        self.start()
+        self.wake()
+        return stream
+
+    def start(self):
+        """Start the loop thread if needed.
+        """
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._wake_recv, self._wake_send = socket.socketpair()
+            self._wake_recv.setblocking(False)
+            self._wake_send.setblocking(False)
+            self._thread = threading.Thread(target=self.run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the loop and close all the streams, the loop closes its
+        wake up sockets when it ends.
+        """
+        with self._lock:
+            self._running = False
+            thread = self._thread
+        self.wake()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self._lock:
+            streams = self.streams + self._added
+            del self._added[:]
+        for stream in streams:
+            stream.finish("multiplexer stopped")
+
+    def wake(self):
+        """Wake the loop up, after a frame was pushed.
+        """
+        sock = self._wake_send
+        if sock is None:
+            return
+        try:
+            sock.send(b"\0")
+        except socket.error:
+            pass
+
+    def run(self):
+        """The loop, run by the multiplexer thread. If the loop itself
+        fails, all the streams are finished so that no reader waits
+        forever.
+        """
+        wake_recv, wake_send = self._wake_recv, self._wake_send
+        try:
+            while self._running:
+                self._step(wake_recv)
+        except Exception as err:
+            LOGGER.exception("Stream multiplexer failed")
+            with self._lock:
+                self._running = False
+                streams = self.streams + self._added
+                del self._added[:]
+            for stream in streams:
+                stream.finish("multiplexer failed: %s" % (err))
+        finally:
+            with self._lock:
+                # Unless a new loop was started meanwhile
+                if self._wake_recv is wake_recv:
+                    self._wake_recv = self._wake_send = None
+            wake_recv.close()
+            wake_send.close()
+
+    def _step(self, wake_recv):
+        """One iteration of the loop.
+        """
+        with self._lock:
+            self.streams = [stream for stream in self.streams + self._added
+                            if not stream.finished]
+            del self._added[:]
+
+        readers = [wake_recv]
+        writers = []
+        for stream in self.streams:
+            try:
+                stream.fill()
+            except Exception as err:
+                stream.finish(err)
+                continue
+            if stream.output is not None:
+                readers.append(stream.output)
+            if stream.input is not None:
+                readers.append(stream.input)
+                if stream.writing:
+                    writers.append(stream.input)
+
+        readable, writable = wait(readers, writers, LOOP_TIMEOUT)
+
+        if wake_recv in readable:
+            while receive(wake_recv):
+                pass
+
+        for stream in self.streams:
+            try:
+                if stream.input in writable:
+                    stream.write_input()
+                if stream.input in readable:
+                    stream.read_input()
+                if stream.output in readable:
+                    stream.read_output()
+            except Exception as err:
+                stream.finish(err)
@@ -18,16 +18,30 @@
 # under the License.
 
 
+import collections
+import concurrent.futures
 import copy
 import json
+import threading
+import time
 import uuid
 import re
 import logging
+import mmap
+import os
 
 from six.moves.urllib import parse as urlparse
 import requests
 import requests_futures.sessions
 
+from angus.client import blobcache
+from angus.client import codec
+from angus.client import flow
+from angus.client import multipart
+from angus.client import scheduler
+from angus.client import streaming
+from angus.client import transport
+from angus.client.multipart import MULTIPART_HEADER, generate_parts
 
 __updated__ = "2017-08-23"
 __author__ = "Aurélien Moreau"
@@ -39,19 +53,103 @@ __status__ = "Production"
 
 LOGGER = logging.getLogger('AngusSDK')
 
-MULTIPART_HEADER = {
-    "Content-Type": "multipart/x-mixed-replace; boundary=myboundary"
-}
+# An item of Service.process_many, job is None when error is set
+ProcessResult = collections.namedtuple(
+    "ProcessResult", ["index", "parameters", "job", "error"])
+
+class JobPoller(object):
+    """Track the pending jobs of a configuration and fetch them, scheduled
+    on a single scheduler.Timer, until they complete. All the jobs due at
+    the same time are fetched concurrently, and each job is polled less and
+    less often, from delay up to max_delay.
+
+    Arguments:
+    conf -- the Configuration object
+    delay -- first polling delay in seconds (default 0.2)
+    max_delay -- maximum polling delay in seconds (default 5)
+    factor -- growth of the delay between two polls (default 1.5)
+    timer -- the scheduler.Timer of the polls (default None, a new one)
+    """
+
+    def __init__(self, conf, delay=0.2, max_delay=5.0, factor=1.5,
+                 timer=None):
+        self.conf = conf
+        self.delay = delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.timer = timer if timer is not None else scheduler.Timer()
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._futures)
+
+    def track(self, job):
+        """Return a future resolved with the job once it is completed.
+        """
+        with self._lock:
+            if job in self._futures:
+                return self._futures[job]
+            future = concurrent.futures.Future()
+            self._futures[job] = future
+        self._push(job, self.delay)
+        return future
+
+    def _push(self, job, delay):
+        self.timer.call_later(delay, lambda: self._fetch(job, delay))
+
+    def _fetch(self, job, delay):
+        try:
+            fetch = self.conf.get(job.endpoint)
+        except Exception as err:
+            self._done(job, error=err)
+            return
+        fetch.add_done_callback(
+            lambda fetch: self._fetched(job, delay, fetch))
+
+    def _fetched(self, job, delay, fetch):
+        try:
+            res = fetch.result()
+            res.raise_for_status()
+            job.set_raw(res.content)
+        except Exception as err:
+            self._done(job, error=err)
+            return
+
+        if job.status == Resource.ACCEPTED:
+            self._push(job, min(delay * self.factor, self.max_delay))
+        else:
+            self._done(job)
+
+    def _done(self, job, error=None):
+        with self._lock:
+            future = self._futures.pop(job)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(job)
+
 
 class Configuration(requests_futures.sessions.FuturesSession):
     """A configuration of connection with Angus.ai cloud.
     """
-    def __init__(self):
-        super(Configuration, self).__init__(max_workers=10)
+    def __init__(self, max_workers=10):
+        super(Configuration, self).__init__(max_workers=max_workers)
+        self.executor = scheduler.PriorityExecutor(max_workers)
+        self.max_workers = max_workers
+        self.admission = transport.AdmissionController()
         self.auth = None
         self.default_root = None
         self.timeout = None
         self.verify = True
+        self.retry = transport.RetryPolicy()
+        self.breakers = None
+        self.hedging = None
+        self.json_codec = codec.STDLIB
+        self.blob_cache = None
+        self._poller = None
+        self._timer = None
+        self._poller_lock = threading.Lock()
 
     def set_credential(self, client_id, access_token):
         self.auth = requests.auth.HTTPBasicAuth(client_id, access_token)
@@ -62,6 +160,95 @@ class Configuration(requests_futures.sessions.FuturesSession):
     def do_not_verify(self):
         self.verify = False
 
+    def set_retry_policy(self, retries=3, backoff=0.2, max_backoff=10.0,
+                         statuses=transport.RETRY_STATUSES):
+        """Retry failed requests, see transport.RetryPolicy, retries=0
+        disables retries.
+        """
+        self.retry = transport.RetryPolicy(retries, backoff, max_backoff,
+                                           statuses)
+
+    def set_circuit_breaker(self, threshold=5, reset_timeout=30.0,
+                            listener=None):
+        """Fail fast on endpoints after threshold consecutive failures, see
+        transport.CircuitBreaker. The states are given by breaker_states.
+        """
+        self.breakers = transport.CircuitBreakers(threshold, reset_timeout,
+                                                  listener)
+
+    def set_hedging(self, percentile=95, max_ratio=0.05, min_samples=20):
+        """Duplicate the Service.process requests slower than the latency
+        percentile, see transport.Hedging for the counters.
+        """
+        self.hedging = transport.Hedging(percentile, max_ratio, min_samples)
+
+    def set_blob_cache(self, max_entries=1024, ttl=blobcache.DEFAULT_TTL,
+                       path=None):
+        """Do not upload again the blobs already uploaded, see
+        blobcache.BlobCache, path keeps the index on disk.
+        """
+        self.blob_cache = blobcache.BlobCache(max_entries, ttl, path)
+
+    def set_json_codec(self, name=codec.AUTO):
+        """Encode and decode JSON with the codec name ("orjson",
+        "rapidjson", "ujson" or "json"), by default the fastest installed,
+        see codec.available.
+        """
+        self.json_codec = codec.get_codec(name)
+
+    def set_priorities(self, lanes=scheduler.LANES, strict=False):
+        """Share the workers between priority lanes, see
+        scheduler.PriorityExecutor. Requests choose their lane with the
+        priority argument (default scheduler.NORMAL).
+        """
+        self.executor.configure(lanes, strict)
+
+    def set_admission(self, rate=None, burst=None, max_queue=None,
+                      policy=transport.BLOCK):
+        """Limit the rate and the number of requests waiting for a worker,
+        see transport.AdmissionController.
+        """
+        self.admission.configure(rate, burst, max_queue, policy)
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting for a worker.
+        """
+        return self.admission.queue_depth
+
+    @property
+    def in_flight(self):
+        """Number of requests being sent.
+        """
+        return self.admission.in_flight
+
+    def breaker_states(self):
+        """Return the circuit state of each endpoint.
+        """
+        if self.breakers is None:
+            return {}
+        return self.breakers.states()
+
+    @property
+    def poller(self):
+        """The JobPoller of the asynchronous jobs of this configuration.
+        """
+        timer = self.timer
+        with self._poller_lock:
+            if self._poller is None:
+                self._poller = JobPoller(self, timer=timer)
+            return self._poller
+
+    @property
+    def timer(self):
+        """The scheduler.Timer shared by the polls and the timeouts of this
+        configuration.
+        """
+        with self._poller_lock:
+            if self._timer is None:
+                self._timer = scheduler.Timer()
+            return self._timer
+
     def get(self, *args, **kwargs):
         if self.timeout:
             kwargs.setdefault("timeout", self.timeout)
@@ -72,31 +259,88 @@ class Configuration(requests_futures.sessions.FuturesSession):
             kwargs.setdefault("timeout", self.timeout)
         return super(Configuration, self).post(*args, **kwargs)
 
+    def request(self, *args, **kwargs):
+        priority = kwargs.pop("priority", None)
+
+        def submit():
+            with self.executor.lane(priority):
+                return super(Configuration, self).request(*args, **kwargs)
+
+        return self.admission.submit(submit)
+
+    def send(self, request, **kwargs):
+        self.admission.started()
+        try:
+            return transport.send(super(Configuration, self).send, request,
+                                  self.retry, self.breakers, **kwargs)
+        finally:
+            self.admission.finished()
+
 
 class Resource(object):
     """A resource is the root object of the Angus.ai API,
     an endpoint with a representation (json).
     This class can sync with the remote resource, and check the status
+
+    The representation can be given as raw JSON bytes, decoded when it is
+    first read, select reads some fields without decoding it.
     """
 
     CREATED = 201
     ACCEPTED = 202
 
-    def __init__(self, parent, name, representation=None, conf=None):
+    def __init__(self, parent, name, representation=None, conf=None,
+                 raw=None):
         self.parent = parent
         self.name = name
         self.endpoint = urlparse.urljoin("%s/" % (self.parent), name)
-        self.representation = representation
         self.conf = conf
+        self._representation = representation
+        self._raw = raw
+
+    @property
+    def representation(self):
+        """The representation of the resource, decoded on first access.
+        """
+        raw = self._raw
+        if raw is not None:
+            self._representation = codec.of(self.conf).loads(raw)
+            self._raw = None
+        return self._representation
+
+    @representation.setter
+    def representation(self, representation):
+        self._representation = representation
+        self._raw = None
+
+    @property
+    def raw(self):
+        """The raw JSON of the representation, None once decoded.
+        """
+        return self._raw
+
+    def set_raw(self, raw):
+        """Replace the representation by raw JSON bytes, decoded lazily.
+        """
+        self._raw = raw
+
+    def select(self, *names):
+        """Return a dict of the top level fields names of the
+        representation, found without decoding the whole representation.
+        """
+        raw = self._raw
+        if raw is not None:
+            return codec.extract(raw, names)
+        if self._representation is None:
+            return {}
+        return dict((name, self._representation[name])
+                    for name in names if name in self._representation)
 
     @property
     def status(self):
         """Return the current resource status.
         """
-        if self.representation is not None:
-            return self.representation['status']
-        else:
-            return None
+        return self.select('status').get('status')
 
     def fetch(self):
         """Synchronize with the online resource.
@@ -104,10 +348,44 @@ class Resource(object):
         res = self.conf.get(self.endpoint)
         res = res.result()
         res.raise_for_status()
-        self.representation = res.json()
+        self.set_raw(res.content)
+
+
+def job_parameters(service, parameters, session=None):
+    """Return a copy of the parameters of a job of service with its session
+    parameters and the state of the session (default the service default
+    session).
+    """
+    if parameters is None:
+        parameters = {}
+    else:
+        parameters = copy.copy(parameters)
+
+    if service.session_parameters is not None:
+        parameters.update(service.session_parameters)
+
+    if session is None:
+        session = service.default_session
+
+    if session is not None:
+        parameters['state'] = session.state()
+    return parameters
+
+
+def build_resource(resource_type, parent, content, conf, restore=None):
+    """Return the resource created by a response content. The
+    representation is decoded lazily, unless it must be restored.
+    """
+    if restore is not None:
+        result = restore(codec.of(conf).loads(content))
+        return resource_type(parent, result['url'],
+                             representation=result, conf=conf)
+    url = codec.extract(content, ('url',))['url']
+    return resource_type(parent, url, conf=conf, raw=content)
 
 
-def result_decorator(result_fn, resource_type, endpoint, conf):
+def result_decorator(result_fn, resource_type, endpoint, conf,
+                     restore=None):
     """
     Decorator used to return a Resource object instead of an HTTPResponse
     when getting the result of a Future during an asynchronous call to a
@@ -117,43 +395,139 @@ def result_decorator(result_fn, resource_type, endpoint, conf):
     :param resource_type: The class of the Resource to return
     :param endpoint: The endpoint used to create the Resource
     :param conf: The Configuration object used to create the Resource
+    :param restore: A function applied to the result representation
     :return: A <resource_type> object with the Future result encapsulated in it
     """
     def handler(*args, **kwargs):
         res = result_fn(*args, **kwargs)
         res.raise_for_status()
 
-        result = res.json()
-        return resource_type(endpoint, result['url'],
-                             representation=result, conf=conf)
+        return build_resource(resource_type, endpoint, res.content, conf,
+                              restore)
     return handler
 
 
-def generate_encoder(attachments):
+class MappedFile(object):
+    """A local file attachment sent from its memory mapped pages instead of
+    being read in memory, workers sending the same file share the page
+    cache.
+
+    The file must stay open until the request is sent, MappedFile is a
+    context manager.
+
+    Arguments:
+    path -- the path of a regular file, or an open regular file
+    """
+
+    def __init__(self, path):
+        if hasattr(path, "fileno"):
+            self.name = getattr(path, "name", None)
+            fileno = path.fileno()
+            self.map = self._map(fileno)
+        else:
+            self.name = path
+            with open(path, "rb") as fileobj:
+                self.map = self._map(fileobj.fileno())
+
+    @staticmethod
+    def _map(fileno):
+        if os.fstat(fileno).st_size == 0:
+            return None
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.map) if self.map is not None else 0
+
+    def view(self):
+        """Return the content of the file without copy.
+        """
+        if self.map is None:
+            return b""
+        try:
+            return memoryview(self.map)
+        except TypeError:
+            # Python 2 mmap objects have no memoryview
+            return self.map
+
+    def close(self):
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # Still used by a request body, unmapped once released
+                pass
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def generate_encoder(attachments, preprocessor=None):
     """Generate a JSON encoder that replaces binary data with
     reference to an part of multipart request.
+
+    With a preprocessor, the attachments are futures of the transformed
+    data, see imaging.Preprocessor.
     """
+    replace = generate_default(attachments, preprocessor)
+
     class Encoder(json.JSONEncoder):
         """The encoder
         """
         def default(self, o):
-            if isinstance(o, Resource):
-                return o.endpoint
-            if hasattr(o, 'read'):
-                file_name = str(uuid.uuid1())
-                field_name = "attachment://%s" % (file_name)
-                attachments.append(
-                    (field_name, (file_name, o, "application/octet-stream")))
-                return field_name
-            return json.JSONEncoder.default(self, o)
+            return replace(o)
 
     return Encoder
 
+def generate_default(attachments, preprocessor=None):
+    """Generate the default function of a JSON codec that replaces
+    binary data with reference to an part of multipart request, see
+    generate_encoder.
+    """
+    def default(o):
+        if isinstance(o, Resource):
+            return o.endpoint
+        if is_attachment(o):
+            return attach(o, attachments, preprocessor)
+        raise TypeError("Object of type %s is not JSON serializable" % (
+            type(o).__name__))
+
+    return default
+
+def is_attachment(o):
+    """Return True if o is sent as an attachment.
+    """
+    return isinstance(o, MappedFile) or hasattr(o, 'read')
+
+def attach(o, attachments, preprocessor=None):
+    """Add o to the attachments, return its reference.
+    """
+    file_name = str(uuid.uuid1())
+    field_name = "attachment://%s" % (file_name)
+    if isinstance(o, MappedFile):
+        o = o.view()
+    if preprocessor is not None:
+        o = preprocessor.submit(o)
+    attachments.append(
+        (field_name, (file_name, o, "application/octet-stream")))
+    return field_name
+
+def read_attachments(attachments):
+    """Replace the file-like objects of attachments by their content.
+    """
+    return [(field, (name, o.read() if hasattr(o, 'read') else o, kind))
+            for field, (name, o, kind) in attachments]
+
 BREAK = "\r\n"
 DBREAK = BREAK+BREAK
 
 def parse(data):
     """Parse multipart data stream to extract parts.
+
+    Deprecated, rescan the whole buffer on each call, use MultipartReader.
     """
     start = data.find("--myboundary\r\n")
     end = data.find(DBREAK, start)
@@ -168,79 +542,119 @@ def parse(data):
             data = data[end+len(BREAK)+content_length:]
     return data, part
 
-def generate_parts(data):
-    """Generate parts for a multipart stream from the generator data.
-    """
-    for params, field, part in data:
-        parts = [
-            "--myboundary",
-            "Content-Type: image/jpeg",
-            "Content-Length: " + str(len(part)),
-            "X-Angus-DataField: " + field,
-            "X-Angus-Parameters: " + json.dumps(params),
-            ""
-        ]
-        yield "".join(map(lambda t: t+"\r\n", parts)).encode()
-        # part is yielded separately as it is a bytearray
-        yield part
-        yield b"\r\n"
-    yield b"--myboundary--"
-
 class Collection(Resource):
     """A collection is a set of Ressources, this class
     enable creation of sub resource (childs) and list them.
     """
     def __init__(self, *args, **kargs):
         super(Collection, self).__init__(*args, **kargs)
+        self.preprocessor = None
+
+    def encode(self, parameters):
+        """Serialize the parameters, return the data, the attachments and
+        the function restoring the result (None if there is nothing to
+        restore).
+        """
+        attachments = []
+
+        data = codec.of(self.conf).dumps(
+            parameters, default=generate_default(attachments,
+                                                 self.preprocessor))
+
+        attachments, restore = self.resolve(attachments)
+        return data, attachments, restore
 
-    def create(self, parameters, resource_type=Resource):
+    def resolve(self, attachments):
+        """Wait for the preprocessed attachments, return them and the
+        function restoring the result (None if there is nothing to restore).
+        """
+        restore = None
+        if attachments and self.preprocessor is not None:
+            attachments, scale = self.preprocessor.resolve(attachments)
+            if scale is not None:
+                restore = lambda result: self.preprocessor.restore(
+                    result, scale)
+
+        return attachments, restore
+
+    def post(self, data, attachments, priority=None):
+        """Send the encoded parameters, return a future of the response.
+        """
+        if attachments:
+            body = multipart.MultipartEncoder(
+                attachments + [('meta', (None, data, 'application/json'))])
+            headers = {'content-type': body.content_type}
+            return self.conf.post(self.endpoint, data=body, headers=headers,
+                                  priority=priority)
+
+        headers = {'content-type': 'application/json'}
+        return self.conf.post(self.endpoint, data=data, headers=headers,
+                              priority=priority)
+
+    def create(self, parameters, resource_type=Resource, hedge=False,
+               priority=None):
         """Create a new child resource.
 
         Arguments:
         parameters -- the resource creation parameters (default {})
         resource_type -- The class of the new resource (default Resource)
+        hedge -- duplicate slow requests if the configuration enables
+        hedging (default False)
+        priority -- the scheduler lane of the request (default None, normal)
         """
-        attachments = []
-
-        data = json.dumps(parameters, cls=generate_encoder(attachments))
+        return self.send(self.encode(parameters), resource_type, hedge,
+                         priority)
 
-        if attachments:
-            files = attachments + [('meta', (None, data, 'application/json'))]
-            resp = self.conf.post(self.endpoint, files=files)
+    def send(self, encoded, resource_type=Resource, hedge=False,
+             priority=None):
+        """Create a new child resource from the (data, attachments, restore)
+        returned by encode, see create.
+        """
+        data, attachments, restore = encoded
+
+        hedging = self.conf.hedging if hedge else None
+        if hedging is not None:
+            hedge = hedging.possible()
+            if hedge:
+                # Both requests need the attachments content
+                attachments = read_attachments(attachments)
+            result = hedging.call(
+                lambda: self.post(data, attachments, priority), hedge)
         else:
-            headers = {'content-type': 'application/json'}
-            resp = self.conf.post(self.endpoint, data=data, headers=headers)
+            result = self.post(data, attachments, priority).result()
 
-        result = resp.result()
         result.raise_for_status()
-        result = result.json()
-        return resource_type(
-            self.endpoint, result['url'], representation=result, conf=self.conf)
+        return build_resource(resource_type, self.endpoint, result.content,
+                              self.conf, restore)
 
-    def create_async(self, parameters, resource_type=Resource):
+    def create_async(self, parameters, resource_type=Resource, priority=None):
         """Create a new child resource asynchronously.
 
         Arguments:
         parameters -- the resource creation parameters (default {})
         callback -- a callback when resource is created
         resource_type -- The class of the new resource (default Resource)
+        priority -- the scheduler lane of the request (default None, normal)
         """
-        attachments = []
+        return self.send_async(self.encode(parameters), resource_type,
+                               priority)
 
-        data = json.dumps(parameters, cls=generate_encoder(attachments))
+    def send_async(self, encoded, resource_type=Resource, priority=None):
+        """Create a new child resource asynchronously from the (data,
+        attachments, restore) returned by encode, see create_async.
+        """
+        data, attachments, restore = encoded
 
-        if self.conf.executor._work_queue.qsize() > self.conf.executor._max_workers:
-            LOGGER.warn("There are too many requests awaiting to "
+        if (self.conf.admission.max_queue is None and
+                self.conf.queue_depth > self.conf.max_workers):
+            LOGGER.warning("There are too many requests awaiting to "
             "be sent. This request will be added to the queue but please try to decrease "
-            "the rate at which \"process\" is called.")
+            "the rate at which \"process\" is called, or limit the queue with "
+            "Configuration.set_admission.")
 
-        if attachments:
-            files = attachments + [('meta', (None, data, 'application/json'))]
-            resp = self.conf.post(self.endpoint, files=files)
-        else:
-            headers = {'content-type': 'application/json'}
-            resp = self.conf.post(self.endpoint, data=data, headers=headers)
-        resp.result = result_decorator(resp.result, resource_type, self.endpoint, self.conf)
+        resp = self.post(data, attachments, priority)
+        resp.result = result_decorator(resp.result, resource_type, self.endpoint, self.conf,
+                                       restore)
         return resp
 
     def list(self, filters):
@@ -251,9 +665,78 @@ class Collection(Resource):
         resp = resp.result()
         resp.raise_for_status()
 
-        result = resp.json()
+        result = codec.of(self.conf).loads(resp.content)
         return result
 
+class Template(object):
+    """A job request whose fixed parameters are serialized once, only the
+    fields given on each call are encoded and spliced in. See
+    Service.prepare.
+
+    The attachments of the fixed parameters are read once and sent with
+    every job.
+    """
+
+    def __init__(self, service, parameters, priority=None):
+        self.service = service
+        self.priority = priority
+        self.keys = frozenset(parameters)
+        data, attachments, self._restore = service.jobs.encode(parameters)
+        self._attachments = read_attachments(attachments)
+        # The fixed object without its closing brace
+        self._head = data[:-1]
+        self._separator = ", " if parameters else ""
+
+    def render(self, fields):
+        """Return the (data, attachments, restore) of a job with the fields
+        added to the fixed parameters.
+        """
+        fixed = self.keys.intersection(fields)
+        if fixed:
+            raise ValueError("Fields already fixed by the template: %s" % (
+                ", ".join(sorted(fixed))))
+
+        jobs = self.service.jobs
+        dumps = codec.of(jobs.conf).dumps
+        attachments = []
+        items = []
+        for key, value in fields.items():
+            if isinstance(value, Resource):
+                value = dumps(value.endpoint)
+            elif is_attachment(value):
+                value = '"%s"' % (attach(value, attachments,
+                                         jobs.preprocessor))
+            else:
+                value = dumps(value, default=generate_default(
+                    attachments, jobs.preprocessor))
+            items.append("%s: %s" % (dumps(key), value))
+
+        data = self._head
+        if items:
+            data += self._separator + ", ".join(items)
+        data += "}"
+
+        attachments, restore = jobs.resolve(attachments)
+        return data, self._attachments + attachments, \
+            restore or self._restore
+
+    def process(self, fields=None, **kwargs):
+        """Create a job with the fixed parameters and the fields, given as
+        a dict or as keyword arguments.
+        """
+        return self.service.jobs.send(
+            self.render(dict(fields or {}, **kwargs)), resource_type=Job,
+            hedge=True, priority=self.priority)
+
+    def process_async(self, fields=None, **kwargs):
+        """Create a job asynchronously, see process.
+
+        Returns a Future object
+        """
+        return self.service.jobs.send_async(
+            self.render(dict(fields or {}, **kwargs)), resource_type=Job,
+            priority=self.priority)
+
 class Session(object):
     """State of the service store in the client
     """
@@ -289,69 +772,136 @@ class Service(Resource):
         self.default_session = None
         self.session_parameters = None
 
-    def process(self, parameters=None, async=False, session=None):
+    def process(self, parameters=None, async=False, session=None,
+                priority=None):
         """Create a job configurate with
 
         Arguments:
         parameters -- the job parameter (default {})
         async -- request an async job (default False)
         session -- a session object (default None)
+        priority -- the scheduler lane, e.g. scheduler.REALTIME (default
+        None, normal)
         """
-        if parameters is None:
-            parameters = {}
-        else:
-            parameters = copy.copy(parameters)
-
-        if self.session_parameters is not None:
-            parameters.update(self.session_parameters)
-
-        if session is None:
-            session = self.default_session
-
-        if session is not None:
-            parameters['state'] = session.state()
-
+        parameters = job_parameters(self, parameters, session)
         parameters['async'] = async
 
         job = self.jobs.create(
             parameters,
-            resource_type=Job)
+            resource_type=Job,
+            hedge=True,
+            priority=priority)
         return job
 
-    def process_async(self, parameters=None, async=False, session=None):
+    def process_async(self, parameters=None, async=False, session=None,
+                      priority=None):
         """Create an asynchronous job configurate with
 
         Arguments:
         parameters -- the job parameter (default {})
         async -- request an async job (default False)
         session -- a session object (default None)
+        priority -- the scheduler lane, e.g. scheduler.BULK (default None,
+        normal)
 
         Returns a Future object
         """
-        if parameters is None:
-            parameters = {}
-        else:
-            parameters = copy.copy(parameters)
+        parameters = job_parameters(self, parameters, session)
+        parameters['async'] = async
 
-        if self.session_parameters is not None:
-            parameters.update(self.session_parameters)
+        fut = self.jobs.create_async(
+            parameters,
+            resource_type=Job,
+            priority=priority)
+        return fut
 
-        if session is None:
-            session = self.default_session
+    def prepare(self, parameters=None, async=False, session=None,
+                priority=None):
+        """Compile the parameters shared by many jobs, with the session
+        parameters and state, into a Template whose process and
+        process_async methods only encode the per-call fields:
 
-        if session is not None:
-            parameters['state'] = session.state()
+            template = service.prepare({'sensitivity': 0.7})
+            job = template.process(image=frame, timestamp=now)
 
+        Arguments:
+        parameters -- the fixed job parameters (default {})
+        async -- request async jobs (default False)
+        session -- a session object (default None)
+        priority -- the scheduler lane of the jobs (default None, normal)
+        """
+        parameters = job_parameters(self, parameters, session)
         parameters['async'] = async
 
-        fut = self.jobs.create_async(
-            parameters,
-            resource_type=Job)
-        return fut
+        return Template(self, parameters, priority)
+
+    def process_many(self, parameters, concurrency=4, ordered=True,
+                     session=None, priority=None):
+        """Create a job for each parameters of an iterable, with at most
+        concurrency jobs in flight. The iterable is consumed lazily.
+
+        Arguments:
+        parameters -- iterable of job parameters
+        concurrency -- number of requests in flight (default 4)
+        ordered -- yield results in the order of parameters, otherwise as
+        soon as they complete (default True)
+        session -- a session object (default None)
+        priority -- the scheduler lane, e.g. scheduler.BULK (default None,
+        normal)
 
-    def stream(self, parameters=None, data=None, session=None):
+        Returns an iterator of ProcessResult, a failed job does not stop the
+        batch and is reported in the error field.
+        """
+        items = enumerate(parameters)
+        running = {}
+        done = {}
+        next_index = 0
+        exhausted = False
+
+        while True:
+            while not exhausted and len(running) < concurrency:
+                try:
+                    index, params = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    future = self.process_async(params, session=session,
+                                                priority=priority)
+                except Exception as err:
+                    done[index] = ProcessResult(index, params, None, err)
+                    continue
+                running[future] = (index, params)
+
+            if ordered:
+                while next_index in done:
+                    yield done.pop(next_index)
+                    next_index += 1
+            else:
+                for index in sorted(done):
+                    yield done.pop(index)
+
+            if not running:
+                if exhausted and not done:
+                    return
+                continue
+
+            finished, _ = concurrent.futures.wait(
+                list(running), return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                index, params = running.pop(future)
+                try:
+                    done[index] = ProcessResult(index, params,
+                                                future.result(), None)
+                except Exception as err:
+                    done[index] = ProcessResult(index, params, None, err)
+
+    def stream(self, parameters=None, data=None, session=None,
+               window=None, policy=flow.BLOCK, reconnect=0,
+               backoff=streaming.RECONNECT_BACKOFF, controller=None,
+               frame_timeout=None):
         """Create a stream object with input and output.
-        Consume data generator and also return a generator for results.
+        Consume data generator and also return an iterator on results.
 
         Arguments:
         parameters -- parameter for stream creation (default {})
@@ -360,40 +910,45 @@ class Service(Resource):
         data_field -- the field in parameters set with the binary data
         data_bin -- the binary data
         session -- a session object (default None)
+        window -- maximum number of frames waiting or in flight (default None,
+        unbounded)
+        policy -- flow.BLOCK, flow.DROP_OLDEST or flow.LATEST, applied when
+        the window is full (default flow.BLOCK)
+        reconnect -- maximum number of consecutive attempts to reopen a
+        broken input or output leg on the same stream (default 0)
+        backoff -- first reconnection delay in seconds, doubled on each
+        attempt
+        controller -- a flow.RateController adapted with the latency of the
+        results, pace data with controller.wrap (default None)
+        frame_timeout -- seconds after which a frame without result leaves
+        the window (default None, a multiple of the p95 latency)
+
+        Returns a streaming.Stream, results are yielded as
+        streaming.StreamResult (bytes).
         """
 
-        if parameters is None:
-            parameters = {}
-        else:
-            parameters = copy.copy(parameters)
+        stream = self.open_stream(parameters, session)
 
-        if self.session_parameters is not None:
-            parameters.update(self.session_parameters)
+        return streaming.Stream(self.conf, stream.result["input"],
+                                stream.result["output"], data,
+                                window=window, policy=policy,
+                                reconnect=reconnect, backoff=backoff,
+                                controller=controller,
+                                frame_timeout=frame_timeout)
 
-        if session is None:
-            session = self.default_session
+    def open_stream(self, parameters=None, session=None):
+        """Create a stream job, its result holds the input and output urls.
 
-        if session is not None:
-            parameters['state'] = session.state()
+        Arguments:
+        parameters -- parameter for stream creation (default {})
+        session -- a session object (default None)
+        """
+        parameters = job_parameters(self, parameters, session)
 
-        stream = self.streams.create(
+        return self.streams.create(
             parameters,
             resource_type=Job)
 
-        input_url = stream.result["input"]
-        output_url = stream.result["output"]
-
-        self.conf.post(input_url, data=generate_parts(data), stream=True,
-                       headers=MULTIPART_HEADER)
-
-        resp = requests.get(output_url, stream=True, auth=self.conf.auth, verify=self.conf.verify)
-        data = ""
-        for content in resp.iter_content(chunk_size=10, decode_unicode=True): # read data as arrived
-            data = data + content
-            data, part = parse(data)
-            if part is not None:
-                yield part
-
     def get_description(self):
         """Return the description of the service
         """
@@ -423,6 +978,21 @@ class Service(Resource):
         """
         self.default_session = None
 
+    def enable_preprocessing(self, max_size=(640, 480), quality=85,
+                             workers=2):
+        """Downscale and re-encode the images attached to the jobs of this
+        service, result coordinates are mapped back to the original size.
+        Requires Pillow, see imaging.Preprocessor.
+        """
+        from angus.client import imaging
+        self.jobs.preprocessor = imaging.Preprocessor(
+            max_size=max_size, quality=quality, workers=workers)
+
+    def disable_preprocessing(self):
+        """Send the attached images unchanged.
+        """
+        self.jobs.preprocessor = None
+
 
 class GenericService(Collection):
 
@@ -460,3 +1030,34 @@ class Job(Resource):
         of the job resource.
         """
         return self.representation
+
+    def typed(self, result_type=None):
+        """Return the result as a compact typed result, see results.
+
+        Arguments:
+        result_type -- the result class (default None, chosen from the
+        service of the job)
+        """
+        from angus.client import results
+        if result_type is None:
+            result_type = results.result_type(self.endpoint)
+        return result_type.from_job(self)
+
+    def done_future(self):
+        """Return a future resolved with this job once it is completed,
+        pending jobs are polled by the configuration JobPoller.
+        """
+        if self.status != Resource.ACCEPTED:
+            future = concurrent.futures.Future()
+            future.set_result(self)
+            return future
+        return self.conf.poller.track(self)
+
+    def wait(self, timeout=None):
+        """Wait for the job to complete and return it.
+
+        Arguments:
+        timeout -- maximum time to wait in seconds, raise
+        concurrent.futures.TimeoutError when expired (default None)
+        """
+        return self.done_future().result(timeout)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import re
+
+from six.moves import intern
+
+from angus.client.imaging import require
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+SERVICE_NAME = re.compile(r"/services/([^/]+)/")
+
+
+def convert(value):
+    """Store lists as tuples and share the strings repeated in results.
+    """
+    if isinstance(value, list):
+        return tuple(value)
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
+
+def value_of(face, field, missing):
+    value = getattr(face, field)
+    return missing if value is None else value
+
+
+class Face(object):
+    """A face of a face_detection result.
+
+    FIELDS are the keys read from the representation, COLUMNS the arrays
+    of a FaceBatch: (name, fields, dtype, shape of a face).
+    """
+
+    __slots__ = ("roi", "roi_confidence")
+
+    FIELDS = ("roi", "roi_confidence")
+
+    COLUMNS = (
+        ("boxes", ("roi",), "float32", (4,)),
+        ("scores", ("roi_confidence",), "float32", ()),
+    )
+
+    def __init__(self, face):
+        for name in self.FIELDS:
+            setattr(self, name, convert(face.get(name)))
+
+    def as_dict(self):
+        """Return the face as in the representation.
+        """
+        return dict((name, getattr(self, name)) for name in self.FIELDS)
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.as_dict())
+
+
+class AgeGenderFace(Face):
+    """A face of an age_and_gender_estimation result.
+    """
+
+    __slots__ = ("age", "age_confidence", "gender", "gender_confidence")
+
+    FIELDS = Face.FIELDS + __slots__
+
+    COLUMNS = Face.COLUMNS + (
+        ("ages", ("age",), "float32", ()),
+        ("age_scores", ("age_confidence",), "float32", ()),
+        ("genders", ("gender",), "U6", ()),
+        ("gender_scores", ("gender_confidence",), "float32", ()),
+    )
+
+
+class GazeFace(Face):
+    """A face of a gaze_analysis result.
+    """
+
+    __slots__ = ("eye_left", "eye_right", "head_yaw", "head_pitch",
+                 "head_roll", "gaze_yaw", "gaze_pitch")
+
+    FIELDS = Face.FIELDS + __slots__
+
+    COLUMNS = Face.COLUMNS + (
+        ("eyes", ("eye_left", "eye_right"), "float32", (2, 2)),
+        ("head_angles", ("head_yaw", "head_pitch", "head_roll"), "float32",
+         (3,)),
+        ("gaze_angles", ("gaze_yaw", "gaze_pitch"), "float32", (2,)),
+    )
+
+
+class FaceDetectionResult(object):
+    """A compact face_detection result. The faces are converted from the
+    representation when first read, the representation is then released.
+    """
+
+    __slots__ = ("input_size", "nb_faces", "_faces", "_representation")
+
+    FACE = Face
+
+    def __init__(self, representation):
+        self.input_size = convert(representation.get("input_size"))
+        self.nb_faces = representation.get("nb_faces")
+        self._faces = None
+        self._representation = representation
+
+    @classmethod
+    def from_job(cls, job):
+        return cls(job.representation)
+
+    @property
+    def faces(self):
+        """The faces, a tuple of FACE.
+        """
+        if self._faces is None:
+            self._faces = tuple(self.FACE(face) for face in
+                                self._representation.get("faces", ()))
+            self._representation = None
+        return self._faces
+
+    def __len__(self):
+        return len(self.faces)
+
+    @classmethod
+    def batch(cls, results):
+        """Return the FaceBatch of results.
+        """
+        return FaceBatch(results, cls.FACE)
+
+    def __repr__(self):
+        return "%s(%d faces)" % (type(self).__name__, len(self))
+
+
+class AgeGenderResult(FaceDetectionResult):
+    """A compact age_and_gender_estimation result.
+    """
+
+    __slots__ = ()
+
+    FACE = AgeGenderFace
+
+
+class GazeResult(FaceDetectionResult):
+    """A compact gaze_analysis result.
+    """
+
+    __slots__ = ()
+
+    FACE = GazeFace
+
+
+class FaceBatch(object):
+    """The faces of many results as contiguous NumPy arrays, one row per
+    face, built when first read. The column names are given by the face
+    type COLUMNS (boxes, scores, ages...), frames gives the index of the
+    result of each face. Missing values are NaN.
+
+    Arguments:
+    results -- results of the same type
+    face_type -- the face type (default Face)
+    """
+
+    def __init__(self, results, face_type=Face):
+        require(numpy, "numpy")
+        self.face_type = face_type
+        self.results = list(results)
+        self._faces = [face for result in self.results
+                       for face in result.faces]
+        self._columns = dict((column[0], column)
+                             for column in face_type.COLUMNS)
+        self._arrays = {}
+        self.frames = numpy.repeat(
+            numpy.arange(len(self.results), dtype="int32"),
+            [len(result) for result in self.results])
+
+    def __len__(self):
+        return len(self._faces)
+
+    def columns(self):
+        """Return the names of the available arrays.
+        """
+        return [column[0] for column in self.face_type.COLUMNS]
+
+    def column(self, name):
+        """Return the array name.
+        """
+        array = self._arrays.get(name)
+        if array is None:
+            if name not in self._columns:
+                raise KeyError("No column '%s' for %s" % (
+                    name, self.face_type.__name__))
+            _, fields, dtype, shape = self._columns[name]
+            if len(fields) == 1:
+                missing = self._missing(dtype, shape)
+                values = [value_of(face, fields[0], missing)
+                          for face in self._faces]
+            else:
+                missing = self._missing(dtype, shape[1:])
+                values = [[value_of(face, field, missing) for field in fields]
+                          for face in self._faces]
+            array = numpy.array(values, dtype=dtype).reshape(
+                (len(self._faces),) + shape)
+            self._arrays[name] = array
+        return array
+
+    @staticmethod
+    def _missing(dtype, shape):
+        if not dtype.startswith("float"):
+            return ""
+        return numpy.full(shape, numpy.nan) if shape else numpy.nan
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.__dict__.get(
+                "_columns", ()):
+            raise AttributeError(name)
+        return self.column(name)
+
+
+# Typed results of the services
+RESULT_TYPES = {
+    "face_detection": FaceDetectionResult,
+    "age_and_gender_estimation": AgeGenderResult,
+    "gaze_analysis": GazeResult,
+}
+
+
+def result_type(endpoint):
+    """Return the result type of the service of a job endpoint.
+    """
+    match = SERVICE_NAME.search(endpoint)
+    if match is None or match.group(1) not in RESULT_TYPES:
+        raise ValueError("No typed result for %s" % (endpoint))
+    return RESULT_TYPES[match.group(1)]
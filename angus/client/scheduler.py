@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import collections
+import concurrent.futures
+import contextlib
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+LOGGER = logging.getLogger('AngusSDK')
+
+REALTIME = "realtime"
+NORMAL = "normal"
+BULK = "bulk"
+
+# Lanes by decreasing priority, with their weight
+LANES = ((REALTIME, 8), (NORMAL, 4), (BULK, 1))
+
+
+class PriorityExecutor(concurrent.futures.Executor):
+    """A thread pool executor with one queue per priority lane.
+
+    A free worker picks its next task from the lanes in proportion of their
+    weights (smooth weighted round robin), or, if strict, from the first
+    non-empty lane, so a bulk lane only gets the workers the higher lanes
+    do not need.
+
+    The lane of the tasks submitted by a thread is given by the lane()
+    context manager (default NORMAL).
+
+    Arguments:
+    max_workers -- number of worker threads
+    lanes -- sequence of (name, weight) by decreasing priority (default LANES)
+    strict -- strict priority instead of weighted shares (default False)
+    """
+
+    def __init__(self, max_workers, lanes=LANES, strict=False):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+        self._queues = collections.OrderedDict()
+        self.configure(lanes, strict)
+
+    def configure(self, lanes=LANES, strict=False):
+        """Change the lanes, the tasks of a removed lane are moved to the
+        lowest priority lane.
+        """
+        lanes = list(lanes)
+        if not lanes:
+            raise ValueError("At least one lane is needed")
+        for name, weight in lanes:
+            if weight <= 0:
+                raise ValueError("Lane '%s' weight must be positive" % (name))
+
+        with self._cond:
+            queues = collections.OrderedDict(
+                (name, self._queues.get(name, collections.deque()))
+                for name, _ in lanes)
+            last = queues[lanes[-1][0]]
+            for name, queue in self._queues.items():
+                if name not in queues:
+                    last.extend(queue)
+            self._queues = queues
+            self._weights = dict(lanes)
+            self._current = dict((name, 0) for name, _ in lanes)
+            self.strict = strict
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def lane(self, name=None):
+        """Submit the tasks of the current thread in the lane name (None
+        is NORMAL).
+        """
+        if name is not None and name not in self._queues:
+            raise ValueError("Unknown priority lane '%s'" % (name))
+        previous = getattr(self._local, "lane", None)
+        self._local.lane = name
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def pending(self):
+        """Return the number of tasks waiting in each lane.
+        """
+        with self._cond:
+            return dict((name, len(queue))
+                        for name, queue in self._queues.items())
+
+    def submit(self, fn, *args, **kwargs):
+        name = getattr(self._local, "lane", None)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if name not in self._queues:
+                name = NORMAL if NORMAL in self._queues else \
+                    next(iter(self._queues))
+            future = concurrent.futures.Future()
+            self._queues[name].append((future, fn, args, kwargs))
+            queued = sum(len(queue) for queue in self._queues.values())
+            if queued > self._idle and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            else:
+                self._cond.notify()
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    while queue:
+                        queue.popleft()[0].cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next(self):
+        """Pop the next task, None if there is none. Called with the lock.
+        """
+        ready = [name for name, queue in self._queues.items() if queue]
+        if not ready:
+            return None
+
+        if self.strict:
+            selected = ready[0]
+        else:
+            total = 0
+            selected = None
+            for name in ready:
+                weight = self._weights[name]
+                self._current[name] += weight
+                total += weight
+                if selected is None or \
+                        self._current[name] > self._current[selected]:
+                    selected = name
+            self._current[selected] -= total
+
+        return self._queues[selected].popleft()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                task = self._next()
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    task = self._next()
+
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as err:
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+            del task, future, fn, args, kwargs
+
+
+class Timer(object):
+    """Call functions at a given time from a single background thread,
+    started on first use. The functions must return quickly, slow work is
+    handed over to an executor.
+    """
+
+    def __init__(self):
+        self._schedule = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_at(self, when, function):
+        """Call function at the time when (as returned by time.time).
+        """
+        with self._cond:
+            heapq.heappush(self._schedule,
+                           (when, next(self._counter), function))
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def call_later(self, delay, function):
+        """Call function after delay seconds.
+        """
+        self.call_at(time.time() + delay, function)
+
+    def run(self):
+        """Call the due functions, run by the timer thread.
+        """
+        while True:
+            with self._cond:
+                while (not self._schedule or
+                       self._schedule[0][0] > time.time()):
+                    if self._schedule:
+                        self._cond.wait(self._schedule[0][0] - time.time())
+                    else:
+                        self._cond.wait()
+                due = []
+                now = time.time()
+                while self._schedule and self._schedule[0][0] <= now:
+                    due.append(heapq.heappop(self._schedule))
+
+            for _, _, function in due:
+                try:
+                    function()
+                except Exception:
+                    LOGGER.exception("Timer call failed")
@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import bisect
+import collections
+import logging
+import threading
+import time
+
+import requests
+
+from angus.client import codec
+from angus.client import flow
+from angus.client.multipart import MULTIPART_HEADER, MultipartReader, \
+    generate_parts
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+LOGGER = logging.getLogger('AngusSDK')
+
+# Read size of the stream output, chunked responses are still delivered as
+# soon as each HTTP chunk arrives.
+STREAM_CHUNK_SIZE = 16384
+
+# Reconnection of the stream legs, in seconds
+RECONNECT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+# Default window size of a resilient stream
+RESILIENT_WINDOW = 64
+
+# A frame without result leaves the window after FRAME_TIMEOUT_FACTOR times
+# the p95 latency, FRAME_TIMEOUT until MIN_TIMEOUT_SAMPLES results arrived
+FRAME_TIMEOUT = 10.0
+FRAME_TIMEOUT_FACTOR = 4
+MIN_FRAME_TIMEOUT = 1.0
+MIN_TIMEOUT_SAMPLES = 20
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram(object):
+    """Rolling histogram of the last latency samples of a stream.
+
+    Arguments:
+    size -- number of samples kept (default 1000)
+    buckets -- ordered upper bounds of the buckets, in seconds
+    """
+
+    def __init__(self, size=1000, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, latency):
+        """Record a new sample.
+        """
+        with self._lock:
+            self.samples.append(latency)
+            self.count += 1
+
+    def counts(self):
+        """Return the list of (upper_bound, count), the last bucket upper
+        bound is None.
+        """
+        counts = [0] * (len(self.buckets) + 1)
+        with self._lock:
+            for sample in self.samples:
+                counts[bisect.bisect_left(self.buckets, sample)] += 1
+        return list(zip(self.buckets + (None,), counts))
+
+    def percentile(self, percent):
+        """Return the given percentile of the samples, None if empty.
+        """
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        index = int(round(percent / 100.0 * (len(samples) - 1)))
+        return samples[index]
+
+    def mean(self):
+        """Return the mean of the samples, None if empty.
+        """
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return None
+        return sum(samples) / float(len(samples))
+
+    def frame_timeout(self):
+        """Return the time after which a frame still waiting for its
+        result is given up, adapted to the p95 latency.
+        """
+        if len(self.samples) < MIN_TIMEOUT_SAMPLES:
+            return FRAME_TIMEOUT
+        return max(MIN_FRAME_TIMEOUT,
+                   FRAME_TIMEOUT_FACTOR * self.percentile(95))
+
+
+class StreamResult(bytes):
+    """A result part of a stream, the raw bytes of the part with the
+    correlation to the frame that produced it.
+
+    sequence -- client sequence id of the frame (None if unknown)
+    parameters -- the data_parameters of the frame
+    sent_at -- time the frame was sent
+    latency -- round-trip time between sending the frame and this result
+    skipped -- sequence ids of the frames the server answered none for
+    headers -- the headers of the part
+    """
+
+    sequence = None
+    parameters = None
+    sent_at = None
+    latency = None
+    skipped = ()
+    headers = None
+    json_codec = codec.STDLIB
+
+    def json(self):
+        """Decode the part as JSON.
+        """
+        return self.json_codec.loads(self)
+
+
+class FrameTracker(object):
+    """Give a sequence id to each frame sent and tie the results back to
+    their frame. The server may echo X-Angus-Sequence in the result part,
+    otherwise results are matched in order.
+    """
+
+    def __init__(self, json_codec=codec.STDLIB):
+        self.json_codec = json_codec
+        self.sequence = 0
+        self.skipped = 0
+        self._sent = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sent)
+
+    def sent(self, parameters):
+        """Record a frame being sent, return its sequence id.
+        """
+        with self._lock:
+            self.sequence += 1
+            self._sent[self.sequence] = (time.time(), parameters)
+            return self.sequence
+
+    def received(self, part, headers):
+        """Build the StreamResult of a part.
+        """
+        result = StreamResult(part)
+        result.headers = headers
+        result.json_codec = self.json_codec
+        now = time.time()
+
+        with self._lock:
+            if not self._sent:
+                return result
+
+            sequence = headers.get("x-angus-sequence") if headers else None
+            if sequence is not None and int(sequence) in self._sent:
+                sequence = int(sequence)
+                skipped = []
+                while next(iter(self._sent)) != sequence:
+                    skipped.append(self._sent.popitem(last=False)[0])
+                result.skipped = tuple(skipped)
+                self.skipped += len(skipped)
+
+            sequence, (sent_at, parameters) = self._sent.popitem(last=False)
+
+        result.sequence = sequence
+        result.parameters = parameters
+        result.sent_at = sent_at
+        result.latency = now - sent_at
+        return result
+
+    def reset(self):
+        """Forget the frames still waiting for a result, return how many.
+        """
+        with self._lock:
+            lost = len(self._sent)
+            self._sent.clear()
+            return lost
+
+
+class Stream(object):
+    """The input and output legs of a stream job. The input consumes the
+    frame generator, iterating on the stream yields a StreamResult for each
+    result part, tied to its frame. Round-trip times are recorded in the
+    latency histogram.
+
+    In resilient mode (reconnect > 0) a broken input or output leg is
+    reopened on the same stream after an exponential backoff, frames are
+    buffered meanwhile in the window. Frames waiting for a result when a leg
+    breaks are counted as lost.
+
+    Arguments:
+    conf -- the Configuration object
+    input_url -- url of the multipart input
+    output_url -- url of the multipart output
+    data -- generator that produces (data_parameters, data_field, data_bin)
+    window -- maximum number of frames waiting or in flight (default None,
+    unbounded, RESILIENT_WINDOW in resilient mode)
+    policy -- what to do when the window is full, see flow.FrameWindow
+    frame_timeout -- seconds after which a frame without result, skipped
+    by the server, leaves the window (default None, adapted to the
+    latency, see LatencyHistogram.frame_timeout)
+    reconnect -- maximum number of consecutive reconnection attempts of a
+    leg (default 0, never reconnect)
+    backoff -- first reconnection delay in seconds, doubled on each attempt
+    up to MAX_BACKOFF (default RECONNECT_BACKOFF)
+    controller -- a flow.RateController fed with the latency of each result
+    and the number of frames waiting for a result (default None)
+    """
+
+    def __init__(self, conf, input_url, output_url, data,
+                 window=None, policy=flow.BLOCK, reconnect=0,
+                 backoff=RECONNECT_BACKOFF, controller=None,
+                 frame_timeout=None):
+        self.conf = conf
+        self.controller = controller
+        self.input_url = input_url
+        self.output_url = output_url
+        self.data = data
+        self.reconnect = reconnect
+        self.backoff = backoff
+        if window is None and reconnect:
+            window = RESILIENT_WINDOW
+        self.tracker = FrameTracker(codec.of(conf))
+        self.latency = LatencyHistogram()
+        self.frame_timeout = frame_timeout
+        if window is not None:
+            self.window = flow.FrameWindow(
+                window, policy, frame_timeout or self.latency.frame_timeout())
+        else:
+            self.window = None
+        self.reconnections = 0
+        self.lost = 0
+        self._failures = 0
+        self._input_done = False
+        self._closed = False
+        self._results = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._results is None:
+            self._results = self.results()
+        return next(self._results)
+
+    next = __next__
+
+    @property
+    def dropped(self):
+        """Number of frames dropped by the window policy.
+        """
+        if self.window is None:
+            return 0
+        return self.window.dropped
+
+    def close(self):
+        """Stop sending frames and reading results.
+        """
+        self._closed = True
+        if self.window is not None:
+            self.window.abort()
+        if self._results is not None:
+            self._results.close()
+
+    def frames(self):
+        """The frames sent on the input leg.
+        """
+        if self.window is None:
+            return self.data
+        return self.window.frames()
+
+    def body(self):
+        """The multipart body of the input leg.
+        """
+        for chunk in generate_parts(self.frames(), self.tracker):
+            yield chunk
+        self._input_done = True
+
+    def open_input(self):
+        """Open the input leg, reopened on failure in resilient mode.
+        """
+        if self._closed:
+            return
+        future = self.conf.post(self.input_url, data=self.body(), stream=True,
+                                headers=MULTIPART_HEADER)
+        if self.reconnect:
+            future.add_done_callback(self._on_input_done)
+
+    def open_output(self):
+        """Open the output leg and return the response.
+        """
+        resp = requests.get(self.output_url, stream=True, auth=self.conf.auth,
+                            verify=self.conf.verify)
+        resp.raise_for_status()
+        return resp
+
+    def results(self):
+        """Open the input and output legs and generate the results.
+        """
+        if self.window is not None:
+            producer = threading.Thread(target=self.window.feed,
+                                        args=(self.data,))
+            producer.daemon = True
+            producer.start()
+
+        self.open_input()
+        try:
+            while True:
+                try:
+                    for result in self._read_output():
+                        yield result
+                    if self._input_done or not self.reconnect:
+                        return
+                    error = None
+                    reason = "closed by server"
+                except (requests.exceptions.ConnectionError,
+                        requests.exceptions.ChunkedEncodingError,
+                        requests.exceptions.HTTPError) as err:
+                    if not self.reconnect:
+                        raise
+                    error = reason = err
+
+                if not self._retry("output", reason):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self._closed = True
+            if self.window is not None:
+                self.window.abort()
+
+    def _read_output(self):
+        """Generate the results of one output connection.
+        """
+        resp = self.open_output()
+        reader = MultipartReader()
+        for content in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            for headers, part in reader.feed(content):
+                result = self.tracker.received(part, headers)
+                if result.latency is not None:
+                    self.latency.add(result.latency)
+                    if self.controller is not None:
+                        self.controller.observe(result.latency,
+                                                len(self.tracker))
+                if self.window is not None:
+                    self.window.release(1 + len(result.skipped))
+                    self._adapt_timeout()
+                self._failures = 0
+                yield result
+
+    def _adapt_timeout(self):
+        """Follow the latency with the frame timeout of the window, unless
+        it was given.
+        """
+        if self.frame_timeout is None and \
+                self.latency.count % MIN_TIMEOUT_SAMPLES == 0:
+            self.window.timeout = self.latency.frame_timeout()
+
+    def _retry(self, leg, error):
+        """Wait before reconnecting a leg, return False if attempts are
+        exhausted.
+        """
+        self._failures += 1
+        if self._closed or self._failures > self.reconnect:
+            LOGGER.error("Stream %s leg lost: %s", leg, error)
+            return False
+
+        delay = min(self.backoff * 2 ** (self._failures - 1), MAX_BACKOFF)
+        LOGGER.warning("Stream %s leg broken (%s), reconnecting in %.1fs",
+                       leg, error, delay)
+        self.reconnections += 1
+        self.lost += self.tracker.reset()
+        if self.window is not None:
+            self.window.reset()
+        time.sleep(delay)
+        return not self._closed
+
+    def _on_input_done(self, future):
+        """Reopen the input leg if it ended before the frames did.
+        """
+        if self._closed or self._input_done:
+            return
+        error = future.exception()
+        if error is None:
+            error = "HTTP %d" % (future.result().status_code)
+
+        def reopen():
+            if self._retry("input", error):
+                self.open_input()
+
+        timer = threading.Thread(target=reopen)
+        timer.daemon = True
+        timer.start()
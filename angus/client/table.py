@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import array
+import csv
+import io
+import threading
+import time
+
+import six
+
+from angus.client.imaging import require
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+# (name, array typecode or None for text, width, face field). The
+# timestamp, session_id and face columns are filled by ResultTable.add.
+COLUMNS = (
+    ("timestamp", "d", 1, None),
+    ("session_id", None, 1, None),
+    ("face", "i", 1, None),
+    ("bbox", "f", 4, "roi"),
+    ("bbox_score", "f", 1, "roi_confidence"),
+    ("age", "f", 1, "age"),
+    ("age_score", "f", 1, "age_confidence"),
+    ("gender", None, 1, "gender"),
+    ("gender_score", "f", 1, "gender_confidence"),
+)
+
+NAN = float("nan")
+
+
+def representation_of(result):
+    """Return the representation of a result: a Job, a StreamResult, a
+    typed result or a representation.
+    """
+    if isinstance(result, dict) or hasattr(result, "faces"):
+        return result
+    if hasattr(result, "representation"):
+        return result.representation
+    return result.json()
+
+
+def faces_of(representation):
+    if isinstance(representation, dict):
+        return representation.get("faces") or ()
+    return representation.faces
+
+
+def field_of(face, field):
+    if isinstance(face, dict):
+        return face.get(field)
+    return getattr(face, field, None)
+
+
+class ResultTable(object):
+    """Accumulate service results as typed columns, one row per face.
+
+    Numeric columns grow in array.array buffers and are exported to NumPy
+    and Arrow without copy. Adding rows after an export leaves the exported
+    arrays unchanged, the buffers are copied before growing. Missing values
+    are NaN (None for text).
+
+    Arguments:
+    columns -- the columns, see COLUMNS (default COLUMNS)
+    keep_empty -- add a row with face -1 for results without faces, so
+    that frames without anyone are counted (default True)
+    """
+
+    def __init__(self, columns=COLUMNS, keep_empty=True):
+        self.columns = tuple(columns)
+        self.keep_empty = keep_empty
+        self._buffers = dict(
+            (name, [] if typecode is None else array.array(typecode))
+            for name, typecode, _, _ in self.columns)
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._rows
+
+    def add(self, result, timestamp=None, session_id=None):
+        """Add the faces of a result (Job, StreamResult, typed result or
+        representation). The timestamp defaults to the time a stream frame
+        was sent, or now.
+
+        Raise ValueError, and add nothing, if a value does not fit the type
+        of its column.
+        """
+        if timestamp is None:
+            timestamp = getattr(result, "sent_at", None) or time.time()
+        if session_id is not None and not isinstance(session_id,
+                                                     six.string_types):
+            session_id = session_id.id
+
+        faces = list(faces_of(representation_of(result)))
+        if not faces and not self.keep_empty:
+            return 0
+
+        rows = []
+        for index, face in enumerate(faces or [None]):
+            row = {"timestamp": timestamp, "session_id": session_id,
+                   "face": index if face is not None else -1}
+            for name, _, _, field in self.columns:
+                if field is not None and face is not None:
+                    row[name] = field_of(face, field)
+            rows.append(row)
+
+        # Converted first, so that a bad value leaves the columns aligned
+        staged = dict(
+            (name, [] if typecode is None else array.array(typecode))
+            for name, typecode, _, _ in self.columns)
+        for row in rows:
+            for name, typecode, width, _ in self.columns:
+                self._stage(staged[name], name, typecode, width,
+                            row.get(name))
+
+        with self._lock:
+            for name, typecode, _, _ in self.columns:
+                self._extend(name, typecode, staged[name])
+            self._rows += len(rows)
+        return len(rows)
+
+    def add_all(self, results, session_id=None):
+        """Add results, ProcessResult of Service.process_many are
+        accepted and the failed ones skipped. Return the number of rows
+        added.
+        """
+        count = 0
+        for result in results:
+            if hasattr(result, "error") and hasattr(result, "job"):
+                if result.error is not None:
+                    continue
+                result = result.job
+            count += self.add(result, session_id=session_id)
+        return count
+
+    @staticmethod
+    def _stage(staged, name, typecode, width, value):
+        """Append the converted value of a column to staged.
+        """
+        if typecode is None:
+            staged.append(value)
+            return
+        try:
+            if value is None:
+                values = [NAN if typecode in "fd" else -1] * width
+            elif width == 1:
+                values = [value]
+            else:
+                values = list(value)[:width]
+                values += [NAN] * (width - len(values))
+            staged.extend(values)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("Invalid value %r for column %s" % (value, name))
+
+    def _extend(self, name, typecode, values):
+        buf = self._buffers[name]
+        try:
+            buf.extend(values)
+        except BufferError:
+            # Exported to NumPy or Arrow, grow a copy
+            buf = self._buffers[name] = array.array(typecode, buf)
+            buf.extend(values)
+
+    def to_numpy(self):
+        """Return a dict of NumPy arrays, numeric columns are views of the
+        buffers and a column of width w has the shape (rows, w).
+        """
+        require(numpy, "numpy")
+        with self._lock:
+            arrays = {}
+            for name, typecode, width, _ in self.columns:
+                buf = self._buffers[name]
+                if typecode is None:
+                    arrays[name] = numpy.array(buf, dtype=object)
+                    continue
+                values = numpy.frombuffer(buf, dtype=buf.typecode) \
+                    if len(buf) else numpy.zeros(0, dtype=buf.typecode)
+                if width > 1:
+                    values = values.reshape(-1, width)
+                arrays[name] = values
+            return arrays
+
+    def to_arrow(self):
+        """Return a pyarrow Table, columns of width w are fixed size lists.
+        """
+        require(pyarrow, "pyarrow")
+        arrays = self.to_numpy()
+        columns = []
+        for name, typecode, width, _ in self.columns:
+            values = arrays[name]
+            if typecode is None:
+                column = pyarrow.array(list(values), type=pyarrow.string())
+            elif width > 1:
+                column = pyarrow.FixedSizeListArray.from_arrays(
+                    pyarrow.array(values.reshape(-1)), width)
+            else:
+                column = pyarrow.array(values)
+            columns.append(column)
+        return pyarrow.Table.from_arrays(
+            columns, names=[column[0] for column in self.columns])
+
+    def to_parquet(self, path, **kwargs):
+        """Write the table to a Parquet file, kwargs are given to
+        pyarrow.parquet.write_table.
+        """
+        table = self.to_arrow()
+        pyarrow.parquet.write_table(table, path, **kwargs)
+
+    def to_csv(self, path):
+        """Write the table to a CSV file, a column of width w is written as
+        w columns name_0 ... name_w-1.
+        """
+        header = []
+        for name, _, width, _ in self.columns:
+            if width == 1:
+                header.append(name)
+            else:
+                header.extend("%s_%d" % (name, i) for i in range(width))
+
+        if six.PY2:
+            output = open(path, "wb")
+        else:
+            output = io.open(path, "w", newline="")
+        with self._lock, output:
+            writer = csv.writer(output)
+            writer.writerow(header)
+            for row in range(self._rows):
+                line = []
+                for name, _, width, _ in self.columns:
+                    buf = self._buffers[name]
+                    line.extend(buf[row * width:(row + 1) * width])
+                writer.writerow(line)
@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import collections
+import concurrent.futures
+import logging
+import random
+import re
+import threading
+import time
+
+import requests
+from requests.packages.urllib3.exceptions import ConnectTimeoutError, \
+    NewConnectionError
+from six.moves.urllib import parse as urlparse
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+LOGGER = logging.getLogger('AngusSDK')
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BLOCK = "block"
+RAISE = "raise"
+SHED = "shed"
+
+# Resource ids in urls, so that all the jobs of a service share a breaker
+RESOURCE_ID = re.compile(r"/[0-9a-fA-F-]{8,}(?=/|$)")
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The request was not sent, the endpoint is considered unhealthy.
+    """
+
+
+class Overloaded(Exception):
+    """The request was refused by the admission controller.
+    """
+
+
+def not_sent(error):
+    """Return True if the request failed before reaching the server.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], "reason", None)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def replayable(request):
+    """Return True if the body of a prepared request can be sent again,
+    rewinding it if needed.
+    """
+    if request.body is None or isinstance(request.body, (bytes, str)):
+        return True
+    rewind = getattr(request.body, "rewind", None)
+    return rewind is not None and rewind()
+
+
+class RetryPolicy(object):
+    """When and how long to wait before sending a request again.
+
+    Failed requests are retried if they did not reach the server, or if
+    they are idempotent (by method, or marked with an X-Angus-Idempotent
+    header), with a jittered exponential backoff. Streamed bodies are only
+    retried if they can be rewound.
+
+    Arguments:
+    retries -- maximum number of retries (default 3)
+    backoff -- base delay in seconds (default 0.2)
+    max_backoff -- maximum delay in seconds (default 10)
+    statuses -- HTTP statuses that are retried (default RETRY_STATUSES)
+    """
+
+    def __init__(self, retries=3, backoff=0.2, max_backoff=10.0,
+                 statuses=RETRY_STATUSES):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+
+    def idempotent(self, request):
+        """Return True if sending the request twice is harmless.
+        """
+        return (request.method in IDEMPOTENT_METHODS or
+                request.headers.get("X-Angus-Idempotent") == "true")
+
+    def should_retry(self, request, attempt, error=None, response=None):
+        """Return True if the request must be sent again after this
+        attempt (starting at 0).
+        """
+        if attempt >= self.retries or not replayable(request):
+            return False
+        if error is not None:
+            return not_sent(error) or self.idempotent(request)
+        return (response.status_code in self.statuses and
+                self.idempotent(request))
+
+    def delay(self, attempt, response=None):
+        """Return the delay before the next attempt, full jitter unless the
+        server asked for more with Retry-After.
+        """
+        delay = random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.max_backoff))
+        return delay
+
+
+class CircuitBreaker(object):
+    """Fail fast on an endpoint after consecutive failures, then let a
+    single probe request through after reset_timeout seconds to check if
+    it recovered.
+
+    Arguments:
+    name -- the endpoint
+    threshold -- consecutive failures that open the circuit (default 5)
+    reset_timeout -- seconds before probing an open circuit (default 30)
+    listener -- called with (name, old_state, new_state) on each change
+    """
+
+    def __init__(self, name, threshold=5, reset_timeout=30.0, listener=None):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.listener = listener
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request can be sent now.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if (self.state == OPEN and
+                    time.time() - self.opened_at >= self.reset_timeout):
+                self._set(HALF_OPEN)
+                return True
+            return False
+
+    def success(self):
+        """Record a successful request.
+        """
+        with self._lock:
+            self.failures = 0
+            self._set(CLOSED)
+
+    def failure(self):
+        """Record a failed request.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.opened_at = time.time()
+                self._set(OPEN)
+
+    def _set(self, state):
+        old, self.state = self.state, state
+        if old != state:
+            LOGGER.warning("Circuit of %s is %s", self.name, state)
+            if self.listener is not None:
+                self.listener(self.name, old, state)
+
+
+class CircuitBreakers(object):
+    """The circuit breakers of a configuration, one per endpoint.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0, listener=None):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.listener = listener
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Return the breaker of the endpoint of an url.
+        """
+        location = urlparse.urlsplit(url)
+        name = "%s://%s%s" % (location.scheme, location.netloc,
+                              RESOURCE_ID.sub("/*", location.path))
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(
+                    name, self.threshold, self.reset_timeout, self.listener)
+            return self.breakers[name]
+
+    def states(self):
+        """Return the state of each endpoint.
+        """
+        with self._lock:
+            return dict((name, breaker.state)
+                        for name, breaker in self.breakers.items())
+
+
+def send(send_fn, request, retry=None, breakers=None, **kwargs):
+    """Send a prepared request with send_fn, retrying it and guarding it
+    with the circuit breaker of its endpoint.
+    """
+    breaker = breakers.get(request.url) if breakers is not None else None
+    attempt = 0
+    while True:
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("Circuit open for %s" % (breaker.name),
+                                   request=request)
+        try:
+            response = send_fn(request, **kwargs)
+        except requests.exceptions.RequestException as err:
+            if breaker is not None:
+                breaker.failure()
+            if retry is None or not retry.should_retry(request, attempt,
+                                                       error=err):
+                raise
+            delay = retry.delay(attempt)
+            LOGGER.warning("%s %s failed (%s), retry in %.2fs",
+                           request.method, request.url, err, delay)
+        else:
+            if breaker is not None:
+                if response.status_code >= 500:
+                    breaker.failure()
+                else:
+                    breaker.success()
+            if retry is None or not retry.should_retry(request, attempt,
+                                                       response=response):
+                return response
+            delay = retry.delay(attempt, response)
+            LOGGER.warning("%s %s returned %d, retry in %.2fs",
+                           request.method, request.url, response.status_code,
+                           delay)
+            response.close()
+
+        time.sleep(delay)
+        attempt += 1
+
+
+class Hedging(object):
+    """Send a duplicate of a request that did not complete after the
+    observed latency percentile, and keep the first answer. The number of
+    duplicates is capped to a ratio of the requests.
+
+    Arguments:
+    percentile -- latency percentile after which a duplicate is sent
+    (default 95)
+    max_ratio -- maximum ratio of requests duplicated (default 0.05)
+    min_samples -- latencies observed before hedging starts (default 20)
+    size -- number of latencies kept (default 1000)
+    """
+
+    def __init__(self, percentile=95, max_ratio=0.05, min_samples=20,
+                 size=1000):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.latencies = collections.deque(maxlen=size)
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self._lock = threading.Lock()
+
+    def threshold(self):
+        """Return the delay after which a request is duplicated, None while
+        there are not enough samples.
+        """
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        index = int(round(self.percentile / 100.0 * (len(latencies) - 1)))
+        return latencies[index]
+
+    def possible(self):
+        """Return True if the next request may be duplicated, the caller
+        must then be able to send it twice.
+        """
+        if self.threshold() is None:
+            return False
+        with self._lock:
+            return self.fired < self.max_ratio * (self.requests + 1)
+
+    def call(self, send, hedge=True):
+        """Call send, which returns a future of a response, a second time
+        if needed and return the first response. With hedge False, send is
+        called once and only the latency is recorded.
+        """
+        start = time.time()
+        primary = send()
+        delay = self.threshold()
+        with self._lock:
+            self.requests += 1
+            allowed = self.fired < self.max_ratio * self.requests
+
+        if not hedge or delay is None or not allowed:
+            return self._record(primary, start)
+
+        done, _ = concurrent.futures.wait([primary], timeout=delay)
+        if done:
+            return self._record(primary, start)
+
+        with self._lock:
+            self.fired += 1
+        hedge = send()
+        done, _ = concurrent.futures.wait(
+            [primary, hedge], return_when=concurrent.futures.FIRST_COMPLETED)
+        winner = hedge if primary not in done else primary
+        loser = primary if winner is hedge else hedge
+        if winner.exception() is not None:
+            winner, loser = loser, winner
+        elif winner is hedge:
+            with self._lock:
+                self.won += 1
+
+        # A running request cannot be interrupted, its response is dropped
+        if not loser.cancel():
+            loser.add_done_callback(close_response)
+        return self._record(winner, start)
+
+    def _record(self, future, start):
+        response = future.result()
+        with self._lock:
+            self.latencies.append(time.time() - start)
+        return response
+
+
+def close_response(future):
+    """Release the connection of the response of a future.
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class AdmissionController(object):
+    """Limit the requests submitted to an executor, with a token bucket
+    rate and a maximum number of requests waiting for a worker. Without
+    limits, it only counts the requests.
+
+    Arguments:
+    rate -- requests per second (default None, unlimited)
+    burst -- size of the token bucket (default max(rate, 1))
+    max_queue -- maximum number of requests waiting (default None)
+    policy -- when a limit is hit, BLOCK waits, RAISE raises Overloaded and
+    SHED cancels the oldest waiting request (the rate limit still waits)
+    """
+
+    def __init__(self, rate=None, burst=None, max_queue=None, policy=BLOCK):
+        self.submitted = 0
+        self.running = 0
+        self.rejected = 0
+        self.shed = 0
+        self._waiting = collections.deque()
+        self._cond = threading.Condition()
+        self.configure(rate, burst, max_queue, policy)
+
+    def configure(self, rate=None, burst=None, max_queue=None, policy=BLOCK):
+        """Change the limits.
+        """
+        if policy not in (BLOCK, RAISE, SHED):
+            raise ValueError("Unknown admission policy '%s'" % (policy))
+        with self._cond:
+            self.rate = rate
+            self.burst = burst if burst is not None else max(rate or 1, 1)
+            self.max_queue = max_queue
+            self.policy = policy
+            self._tokens = self.burst
+            self._stamp = time.time()
+            self._cond.notify_all()
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting for a worker.
+        """
+        return max(self.submitted - self.running, 0)
+
+    @property
+    def in_flight(self):
+        """Number of requests being sent.
+        """
+        return self.running
+
+    def submit(self, submit_fn):
+        """Admit a request and call submit_fn, which returns its future.
+        """
+        with self._cond:
+            self._admit_queue()
+            self._admit_rate()
+            self.submitted += 1
+
+        try:
+            future = submit_fn()
+        except Exception:
+            with self._cond:
+                self.submitted -= 1
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._waiting.append(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def started(self):
+        """A worker starts sending a request.
+        """
+        with self._cond:
+            self.running += 1
+            self._cond.notify_all()
+
+    def finished(self):
+        """A worker is done with a request.
+        """
+        with self._cond:
+            self.running -= 1
+            self._cond.notify_all()
+
+    def _admit_queue(self):
+        if self.max_queue is None:
+            return
+        while self.queue_depth >= self.max_queue:
+            if self.policy == RAISE:
+                self.rejected += 1
+                raise Overloaded("%d requests waiting" % (self.queue_depth))
+            if self.policy == SHED and self._shed():
+                continue
+            self._cond.wait()
+
+    def _admit_rate(self):
+        if self.rate is None:
+            return
+        while True:
+            now = time.time()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            if self.policy == RAISE:
+                self.rejected += 1
+                raise Overloaded("Rate limit of %s requests/s" % (self.rate))
+            self._cond.wait((1 - self._tokens) / self.rate)
+
+    def _shed(self):
+        """Cancel the oldest waiting request, return True if one was.
+        """
+        while self._waiting:
+            future = self._waiting.popleft()
+            if future.cancel():
+                self.shed += 1
+                LOGGER.warning("Too many requests waiting, oldest dropped")
+                return True
+        return False
+
+    def _done(self, future):
+        with self._cond:
+            self.submitted -= 1
+            while self._waiting and (self._waiting[0].running() or
+                                     self._waiting[0].done()):
+                self._waiting.popleft()
+            self._cond.notify_all()
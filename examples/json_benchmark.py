@@ -0,0 +1,86 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Compare the JSON codecs installed on a typical result payload:
+
+    python json_benchmark.py [number of faces] [iterations]
+"""
+
+import io
+import sys
+import timeit
+
+from angus.client import codec
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate", "Raphaël Lumbroso"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+def make_result(faces):
+    """An age_and_gender_estimation like result with faces faces.
+    """
+    return {
+        "url": "https://gate.angus.ai/services/age_and_gender_estimation/1/"
+               "jobs/fa7a4b62-3c39-11e7-9d0f-0242ac110004",
+        "status": 201,
+        "input_size": [1280, 720],
+        "nb_faces": faces,
+        "faces": [{
+            "roi": [100 + i, 200 + i, 150, 150],
+            "roi_confidence": 0.87,
+            "age": 30.5 + i,
+            "age_confidence": 0.62,
+            "gender": "female" if i % 2 else "male",
+            "gender_confidence": 0.91,
+        } for i in range(faces)],
+    }
+
+
+def main():
+    faces = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    result = make_result(faces)
+    payload = codec.STDLIB.dumps(result).encode("utf-8")
+    parameters = {"image": io.BytesIO(b"jpeg"), "sensitivity": 0.7,
+                  "async": False, "state": {"session_id": "a-session"}}
+
+    print("%d faces, %d bytes, %d iterations" % (faces, len(payload),
+                                                 number))
+    print("%-10s %14s %14s" % ("codec", "decode (us)", "encode (us)"))
+    for name in codec.available():
+        json_codec = codec.get_codec(name)
+        decode = timeit.timeit(lambda: json_codec.loads(payload),
+                               number=number)
+        encode = timeit.timeit(
+            lambda: json_codec.dumps(
+                parameters, default=rest.generate_default([])),
+            number=number)
+        print("%-10s %14.1f %14.1f" % (name, decode * 1e6 / number,
+                                       encode * 1e6 / number))
+
+if __name__ == '__main__':
+    main()
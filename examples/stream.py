@@ -17,7 +17,6 @@
 # specific language governing permissions and limitations
 # under the License.
 
-import json
 import datetime
 
 import angus.client
@@ -39,4 +38,4 @@ def data():
         yield ({"timestamp": timestamp.isoformat()}, "image", img)
 
 for job in s.stream(data=data()):
-    print(json.loads(job))
+    print("frame %d in %.3fs: %s" % (job.sequence, job.latency, job.json()))
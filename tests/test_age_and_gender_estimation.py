@@ -18,7 +18,6 @@
 # under the License.
 
 import io
-import time
 
 import pytest
 
@@ -76,8 +75,7 @@ def check_result_res_eventually(result_res, howmany=1):
     isinstance(result_res, Resource)
 
     if result_res.status == Resource.ACCEPTED:
-        time.sleep(10)
-        result_res.fetch()
+        result_res.wait(timeout=10)
 
     check_result_res(result_res, howmany)
 
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import concurrent.futures
+import io
+import json
+import os
+import tempfile
+import time
+
+import pytest
+import requests
+
+from angus.client import blobcache
+from angus.client import cloud
+from angus.client import codec
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+class CountingBlobs(cloud.BlobDirectory):
+    """Count the uploads instead of sending them, each one takes delay
+    seconds.
+    """
+
+    def __init__(self, conf, delay=0):
+        super(CountingBlobs, self).__init__("http://localhost", "blobs",
+                                            conf=conf)
+        self.uploads = []
+        self.delay = delay
+        self.error = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(4)
+
+    def upload_async(self, binary):
+        self.uploads.append(binary.read())
+        name = str(len(self.uploads))
+
+        def upload():
+            time.sleep(self.delay)
+            return rest.Resource(self.endpoint, name, conf=self.conf)
+
+        future = self.executor.submit(upload)
+        if self.error is not None:
+            # HTTP errors are raised by the decorated result, see
+            # rest.result_decorator
+            error = self.error
+            wrapped = future.result
+
+            def result(*args, **kwargs):
+                wrapped(*args, **kwargs)
+                raise error
+
+            future.result = result
+        return future
+
+
+class FakeRoot(object):
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+
+def test_skip_uploads():
+    conf = rest.Configuration()
+    conf.set_blob_cache(max_entries=2)
+    blobs = CountingBlobs(conf)
+
+    first = blobs.create(io.BytesIO(b"reference"))
+    again = blobs.create(io.BytesIO(b"reference"))
+    other = blobs.create(io.BytesIO(b"background"))
+    assert first.endpoint == again.endpoint == "http://localhost/blobs/1"
+    assert other.endpoint == "http://localhost/blobs/2"
+    assert blobs.uploads == [b"reference", b"background"]
+    assert conf.blob_cache.hits == 1
+
+    blobs.create(io.BytesIO(b"third"))
+    assert len(conf.blob_cache) == 2
+    blobs.create(io.BytesIO(b"reference"))
+    assert len(blobs.uploads) == 4
+
+
+def test_file_hashed_in_place():
+    conf = rest.Configuration()
+    conf.set_blob_cache()
+    blobs = CountingBlobs(conf)
+
+    content = b"x" * (3 * blobcache.CHUNK_SIZE + 10)
+    fileobj = io.BytesIO(b"header" + content)
+    fileobj.read(6)
+    assert blobcache.file_digest(fileobj) == blobcache.digest(content)
+    assert fileobj.tell() == 6
+    blobs.create(fileobj)
+    assert blobs.uploads == [content]
+
+
+def test_failed_upload_not_cached(caplog):
+    conf = rest.Configuration()
+    conf.set_blob_cache()
+    blobs = CountingBlobs(conf)
+    blobs.error = requests.HTTPError("500 Server Error")
+
+    with pytest.raises(requests.HTTPError):
+        blobs.create(io.BytesIO(b"reference"))
+    blobs.executor.shutdown()
+    blobs.executor = concurrent.futures.ThreadPoolExecutor(4)
+    assert len(conf.blob_cache) == 0
+    assert "exception calling callback" not in caplog.text
+
+    blobs.error = None
+    blobs.create(io.BytesIO(b"reference"))
+    assert len(blobs.uploads) == 2
+
+
+def test_ttl_and_disk_index():
+    path = os.path.join(tempfile.mkdtemp(), "blobs.db")
+    cache = blobcache.BlobCache(path=path, ttl=0.2)
+    key = blobcache.digest(b"reference")
+    cache.put(key, "http://localhost/blobs/1")
+    cache.close()
+
+    cache = blobcache.BlobCache(path=path, ttl=0.2)
+    assert cache.get(key) == "http://localhost/blobs/1"
+    time.sleep(0.3)
+    assert cache.get(key) is None
+    cache.put(key, "http://localhost/blobs/2")
+    cache.invalidate(key)
+    assert cache.get(key) is None
+
+
+@pytest.mark.parametrize("name", codec.available())
+def test_parallel_uploads(name):
+    root = FakeRoot(CountingBlobs(rest.Configuration(), delay=0.3))
+    image = io.BytesIO(b"image")
+    parameters = {"image": image, "again": image,
+                  "references": [io.BytesIO(b"a"), io.BytesIO(b"b")]}
+    start = time.time()
+    data = json.loads(cloud.encode_blobs(root, parameters,
+                                         codec.get_codec(name)))
+    assert time.time() - start < 0.6
+    assert len(root.blobs.uploads) == 3
+    assert data["again"] == data["image"]
+    endpoints = set([data["image"]] + data["references"])
+    assert endpoints == set("http://localhost/blobs/%d" % (i)
+                            for i in range(1, 4))
+
+
+def test_encoder_uploads():
+    root = FakeRoot(CountingBlobs(rest.Configuration(), delay=0.3))
+    parameters = [io.BytesIO(b"a"), io.BytesIO(b"b")]
+    start = time.time()
+    data = json.loads(json.dumps(parameters,
+                                 cls=cloud.generate_encoder(root)))
+    assert time.time() - start < 0.6
+    assert sorted(data) == ["http://localhost/blobs/1",
+                            "http://localhost/blobs/2"]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+
+import io
+
+import pytest
+
+from angus.client import codec
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+@pytest.mark.parametrize("name", codec.available())
+def test_round_trip(name):
+    json_codec = codec.get_codec(name)
+    resource = rest.Resource("http://localhost/blobs", "1")
+    attachments = []
+    data = json_codec.dumps(
+        {"image": io.BytesIO(b"image"), "blob": resource, "zone": [1.5, 2]},
+        default=rest.generate_default(attachments))
+
+    result = json_codec.loads(data.encode("utf-8"))
+    assert result["blob"] == "http://localhost/blobs/1"
+    assert result["image"] == attachments[0][0]
+    assert result["zone"] == [1.5, 2]
+
+    with pytest.raises(TypeError):
+        json_codec.dumps({"bad": object()},
+                         default=rest.generate_default(attachments))
+
+
+def test_get_codec():
+    assert codec.get_codec("json").name == "json"
+    assert codec.get_codec().name == codec.available()[0]
+    with pytest.raises(ValueError):
+        codec.get_codec("yaml")
+
+    conf = rest.Configuration()
+    assert codec.of(conf) is codec.STDLIB
+    conf.set_json_codec("json")
+    assert codec.of(conf).name == "json"
+    assert codec.of(None) is codec.STDLIB
+
+
+def test_extract():
+    data = (b'{"faces": [{"status": 0, "url": "nested"}], "nested": '
+            b'{"url": "no"}, "label": "a \\"url\\": b", '
+            b'"url" : "https://gate.angus.ai/jobs/1", "status": 201}')
+    assert codec.extract(data, ["url", "status"]) == {
+        "url": "https://gate.angus.ai/jobs/1", "status": 201}
+    assert codec.extract(data, ["faces"])["faces"][0]["url"] == "nested"
+    assert codec.extract(data, ["missing"]) == {}
+
+
+def test_lazy_job():
+    raw = b'{"url": "http://localhost/jobs/1", "status": 201, "faces": []}'
+    job = rest.build_resource(rest.Job, "http://localhost/jobs", raw, None)
+    assert job.endpoint == "http://localhost/jobs/1"
+    assert job.status == rest.Resource.CREATED
+    assert job.select("faces") == {"faces": []}
+    assert job.raw is raw
+
+    assert job.result["faces"] == []
+    assert job.raw is None
+    assert job.status == rest.Resource.CREATED
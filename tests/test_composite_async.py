@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import concurrent.futures
+import io
+import json
+import threading
+import time
+
+import requests
+
+from angus.client import cloud
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+ROOT = "http://localhost"
+
+# Delay and status of each fake service
+SERVICES = {
+    "face_detection": (0.05, 201),
+    "age_and_gender_estimation": (0.15, 201),
+    "gaze_analysis": (1.0, 201),
+    "broken": (0.0, 500),
+}
+
+
+class FakeConfiguration(rest.Configuration):
+    """Answer the job creations after the delay of their service.
+    """
+
+    def __init__(self):
+        super(FakeConfiguration, self).__init__()
+        self.default_root = ROOT
+        self.fake = concurrent.futures.ThreadPoolExecutor(len(SERVICES))
+
+    def post(self, url, **kwargs):
+        name = url.split("/")[-2]
+        delay, status = SERVICES[name]
+
+        def answer():
+            time.sleep(delay)
+            response = requests.Response()
+            response.status_code = status
+            response._content = json.dumps(
+                {"url": url + "/1", "status": status,
+                 "service": name}).encode("utf-8")
+            return response
+
+        return self.fake.submit(answer)
+
+
+class SlowBlobs(object):
+    """Blobs uploaded after a delay.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.executor = concurrent.futures.ThreadPoolExecutor(2)
+
+    def create_async(self, binary):
+        def upload():
+            time.sleep(self.delay)
+            return rest.Resource(ROOT + "/blobs", "1")
+        return self.executor.submit(upload)
+
+
+def make_composite():
+    conf = FakeConfiguration()
+    services = dict(
+        (name, rest.Service(ROOT + "/services", name, conf=conf))
+        for name in SERVICES)
+    return cloud.CompositeService("memory:///", "composite",
+                                  services=services, conf=conf)
+
+
+def test_iter_results():
+    composite = make_composite()
+    results = list(composite.iter_results(
+        {}, timeout={"gaze_analysis": 0.3}, deadline=2.0))
+    names = [name for name, _ in results]
+    assert names == ["broken", "face_detection",
+                     "age_and_gender_estimation", "gaze_analysis"]
+    assert isinstance(results[0][1], requests.HTTPError)
+    assert results[1][1]["service"] == "face_detection"
+    assert isinstance(results[3][1], concurrent.futures.TimeoutError)
+
+
+def test_process_async_deadline():
+    composite = make_composite()
+    start = time.time()
+    future = composite.process_async({}, deadline=0.4)
+    job = future.result()
+    assert time.time() - start < 0.8
+    assert job.status == 200
+    assert set(job.result) == set(["face_detection",
+                                   "age_and_gender_estimation", "status",
+                                   "missing"])
+    assert job.result["missing"] == ["broken", "gaze_analysis"]
+
+
+def test_process_async_shares_timer():
+    composite = make_composite()
+    before = threading.active_count()
+    futures = [composite.process_async({}, timeout={"gaze_analysis": 0.3})
+               for _ in range(20)]
+    # The fake services workers and the timer, no thread per call
+    assert threading.active_count() - before <= len(SERVICES) + 1
+    for future in futures:
+        job = future.result(timeout=5)
+        assert job.result["missing"] == ["broken", "gaze_analysis"]
+        assert job.result["age_and_gender_estimation"]["status"] == 201
+
+
+def test_process_async_attachment():
+    composite = make_composite()
+    composite.root.blobs = SlowBlobs(0.5)
+    start = time.time()
+    future = composite.process_async({"image": io.BytesIO(b"jpeg")},
+                                     timeout={"gaze_analysis": 0.6})
+    assert time.time() - start < 0.2
+    job = future.result(timeout=5)
+    assert job.result["face_detection"]["status"] == 201
+    assert job.result["missing"] == ["broken", "gaze_analysis"]
+    # The timeout runs from the call, uploads included
+    assert time.time() - start < 0.9
+
+
+def test_deadline_during_upload():
+    composite = make_composite()
+    composite.root.blobs = SlowBlobs(1.0)
+    start = time.time()
+    job = composite.process({"image": io.BytesIO(b"jpeg")}, deadline=0.3)
+    assert time.time() - start < 0.6
+    assert job.result["missing"] == sorted(SERVICES)
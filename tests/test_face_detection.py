@@ -18,7 +18,6 @@
 # under the License.
 
 import math
-import time
 import io
 
 import pytest
@@ -79,8 +78,7 @@ def check_result_res_eventually(result_res, howmany=1):
     isinstance(result_res, Resource)
 
     if result_res.status == Resource.ACCEPTED:
-        time.sleep(10)
-        result_res.fetch()
+        result_res.wait(timeout=10)
 
     check_result_res(result_res, howmany)
 
@@ -91,3 +89,19 @@ def test_embeded_sync(service):
             'image': open(IMG_1, 'rb')},
         async=False)
     check_result_res_eventually(result_res)
+
+
+def test_preprocessing(service):
+    service.enable_preprocessing(max_size=(640, 480))
+    try:
+        result_res = service.process(
+            parameters={
+                'image': open(IMG_LARGE, 'rb')})
+    finally:
+        service.disable_preprocessing()
+
+    if result_res.status == Resource.ACCEPTED:
+        result_res.wait(timeout=10)
+
+    assert result_res.status == Resource.CREATED
+    assert 'faces' in result_res.representation
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import threading
+import time
+
+import pytest
+
+from angus.client import flow
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        flow.FrameWindow(2, policy="random")
+
+
+def test_drop_oldest():
+    window = flow.FrameWindow(2, policy=flow.DROP_OLDEST)
+    for i in range(5):
+        window.put(i)
+    assert window.dropped == 3
+    assert len(window) == 2
+    assert window.get() == 3
+    assert window.get() == 4
+    assert window.in_flight == 2
+
+    # Nothing waiting can be dropped, the new frame is
+    assert not window.put(5)
+    assert window.dropped == 4
+
+
+def test_latest():
+    window = flow.FrameWindow(1, policy=flow.LATEST)
+    window.put(0)
+    assert window.get() == 0
+    for i in range(1, 4):
+        window.put(i)
+    assert window.pending == 1
+    assert window.dropped == 2
+    window.release()
+    assert window.get() == 3
+
+
+def test_block():
+    window = flow.FrameWindow(2, policy=flow.BLOCK)
+    producer = threading.Thread(target=window.feed, args=(iter(range(4)),))
+    producer.daemon = True
+    producer.start()
+
+    assert window.get() == 0
+    assert window.get() == 1
+    time.sleep(0.1)
+    assert window.pending == 0
+    assert len(window) == 2
+
+    window.release(2)
+    assert list(window.frames()) == [2, 3]
+    assert window.dropped == 0
+
+
+def test_timeout():
+    window = flow.FrameWindow(1, timeout=0.05)
+    producer = threading.Thread(target=window.feed, args=(iter(range(2)),))
+    producer.daemon = True
+    producer.start()
+    assert list(window.frames()) == [0, 1]
+    assert window.expired == 1
+
+
+def test_rate_controller_adapts():
+    controller = flow.RateController(target=0.5, rate=5, max_rate=6)
+    for _ in range(10):
+        controller.observe(0.1, queue=0)
+    assert controller.rate == 6
+
+    controller.observe(3.0, queue=0)
+    assert controller.rate < 6
+    rate = controller.rate
+
+    # A single cut per latency period
+    controller.observe(3.0, queue=0)
+    assert controller.rate == rate
+
+
+def test_rate_controller_queue():
+    controller = flow.RateController(target=0.5, rate=5, max_queue=2)
+    controller.observe(0.1, queue=10)
+    assert controller.rate < 5
+
+
+def test_rate_controller_wrap():
+    controller = flow.RateController(target=1.0, rate=10)
+    frames = list(controller.wrap(iter(range(100))))
+    assert len(frames) < 100
+    assert controller.skipped == 100 - len(frames)
+
+    start = time.time()
+    assert list(controller.wrap(iter(range(3)), drop=False)) == [0, 1, 2]
+    assert time.time() - start >= 0.2
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from angus.client import imaging, streaming
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+IMG_1 = 'macgyver.jpg'
+IMG_LARGE = 'large.jpg'
+
+
+class CountingService(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, parameters):
+        self.calls += 1
+        return self.calls
+
+
+def test_signature_array():
+    frame = numpy.zeros((480, 640, 3), dtype=numpy.uint8)
+    assert imaging.signature(frame).shape == (16, 16)
+
+
+def test_signature_jpeg():
+    pytest.importorskip("PIL")
+    with open(IMG_1, 'rb') as image:
+        assert imaging.signature(image).shape == (16, 16)
+        assert image.tell() == 0
+
+
+def test_signature_encoded_array():
+    pytest.importorskip("PIL")
+    with open(IMG_1, 'rb') as image:
+        jpeg = image.read()
+    frame = numpy.frombuffer(jpeg, numpy.uint8)
+    assert imaging.signature(frame).shape == (16, 16)
+    assert numpy.array_equal(imaging.signature(frame),
+                             imaging.signature(jpeg))
+
+    gate = imaging.MotionGate()
+    frames = [({}, "image", frame), ({}, "image", memoryview(jpeg))]
+    assert len(list(gate.wrap(frames))) == 1
+
+
+def test_gate_skips_still_frames():
+    gate = imaging.MotionGate(threshold=0.05, interval=60)
+    still = numpy.full((120, 160), 100, dtype=numpy.uint8)
+    moved = still.copy()
+    moved[:, :80] = 200
+
+    frames = [({}, "image", f) for f in [still, still, still + 1, moved, moved]]
+    assert [f[2] is moved for f in gate.wrap(frames)] == [False, True]
+    assert gate.skipped == 3
+
+
+def test_gate_replays_results():
+    gate = imaging.MotionGate(threshold=0.05, interval=60)
+    still = numpy.full((120, 160), 100, dtype=numpy.uint8)
+    moved = still.copy()
+    moved[:, :80] = 200
+
+    frames = [({"n": n}, "image", f)
+              for n, f in enumerate([still, still, still, moved, moved])]
+    results = []
+    for parameters, _, _ in gate.wrap(frames):
+        result = streaming.StreamResult(b"{}")
+        result.parameters = parameters
+        results.append(result)
+
+    replayed = list(gate.replay(iter(results)))
+    assert [result.parameters["n"] for result in replayed] == \
+        [0, 0, 0, 3, 3]
+
+
+def test_gate_interval():
+    gate = imaging.MotionGate(interval=0)
+    still = numpy.zeros((120, 160), dtype=numpy.uint8)
+    assert gate.check(still)
+    assert gate.check(still)
+
+
+def test_gate_process_reuses_result():
+    gate = imaging.MotionGate(interval=60)
+    service = CountingService()
+    still = numpy.zeros((120, 160), dtype=numpy.uint8)
+    results = [gate.process(service, {"image": still}) for _ in range(3)]
+    assert results == [1, 1, 1]
+    assert service.calls == 1
+
+
+def test_preprocessor_resize():
+    pytest.importorskip("PIL")
+    preprocessor = imaging.Preprocessor(max_size=(320, 240), quality=70)
+    with open(IMG_LARGE, 'rb') as image:
+        original = len(image.read())
+        image.seek(0)
+        resized, scale = preprocessor.submit(image).result()
+
+    assert len(resized.read()) < original
+    assert scale[0] < 1 and scale[1] < 1
+
+
+def test_preprocessor_passthrough():
+    pytest.importorskip("PIL")
+    preprocessor = imaging.Preprocessor(max_size=(10000, 10000))
+    with open(IMG_1, 'rb') as image:
+        assert preprocessor.transform(image) == (image, None)
+
+    sound = b"RIFF not an image"
+    assert preprocessor.transform(sound) == (sound, None)
+
+
+def test_preprocessor_restore():
+    pytest.importorskip("PIL")
+    preprocessor = imaging.Preprocessor()
+    result = {
+        "url": "http://gate/jobs/1",
+        "input_size": [426, 240],
+        "faces": [{"roi": [10, 20, 30, 40], "roi_confidence": 0.5}],
+        "eye_left": [5, 5],
+        "center": [2.5, 1.0],
+    }
+    restored = preprocessor.restore(result, (0.5, 0.25))
+    assert restored["faces"][0]["roi"] == [20, 80, 60, 160]
+    assert all(isinstance(item, int) for item in restored["faces"][0]["roi"])
+    assert restored["center"] == [5.0, 4.0]
+    assert restored["faces"][0]["roi_confidence"] == 0.5
+    assert restored["eye_left"] == [10, 20]
+    assert restored["url"] == result["url"]
+
+
+def test_preprocessor_restore_input_size():
+    pytest.importorskip("PIL")
+    preprocessor = imaging.Preprocessor(max_size=(320, 240))
+    with open(IMG_LARGE, 'rb') as image:
+        _, scale = preprocessor.transform(image)
+        image.seek(0)
+        width, height = imaging.Image.open(image).size
+
+    result = {"input_size": [int(round(width * scale[0])),
+                             int(round(height * scale[1]))]}
+    assert preprocessor.restore(result, scale) == \
+        {"input_size": [width, height]}
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import io
+import json
+import mmap
+import tempfile
+
+import pytest
+import requests
+
+from angus.client import multipart, rest
+from angus.client.multipart import MultipartEncoder, MultipartReader, \
+    generate_parts
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+def make_part(body, field="result"):
+    header = ("--myboundary\r\n"
+              "Content-Type: application/json\r\n"
+              "Content-Length: %d\r\n"
+              "X-Angus-DataField: %s\r\n\r\n") % (len(body), field)
+    return header.encode() + body + b"\r\n"
+
+
+def feed_by(reader, data, size):
+    parts = []
+    for i in range(0, len(data), size):
+        parts.extend(body for _, body in reader.feed(data[i:i+size]))
+    return parts
+
+
+def test_single_part():
+    reader = MultipartReader()
+    [(headers, body)] = reader.feed(make_part(b'{"a": 1}'))
+    assert body == b'{"a": 1}'
+    assert headers["x-angus-datafield"] == "result"
+
+
+def test_headers_of_each_part():
+    reader = MultipartReader()
+    data = make_part(b"1", "first") + make_part(b"2", "second") + \
+        make_part(b"3", "third")
+    parts = reader.feed(data + b"--myboundary--")
+    assert [(headers["x-angus-datafield"], body)
+            for headers, body in parts] == \
+        [("first", b"1"), ("second", b"2"), ("third", b"3")]
+
+
+def test_split_reads():
+    bodies = [b'{"faces": []}', b"\x00\r\n--myboundary\r\n\xff", b"x" * 1000]
+    data = b"".join(make_part(body) for body in bodies) + b"--myboundary--"
+    for size in [1, 3, 7, 64, 4096]:
+        assert feed_by(MultipartReader(), data, size) == bodies
+
+
+def test_incomplete_part():
+    reader = MultipartReader()
+    data = make_part(b"0123456789")
+    assert reader.feed(data[:-4]) == []
+    assert [body for _, body in reader.feed(data[-4:])] == [b"0123456789"]
+
+
+def test_compaction():
+    reader = MultipartReader()
+    body = b"y" * 10000
+    data = make_part(body) * 50
+    assert feed_by(reader, data, 5000) == [body] * 50
+    assert len(reader.buffer) < len(data)
+
+
+def test_generate_parts_buffers():
+    numpy = pytest.importorskip("numpy")
+    payload = b"\xff\xd8" + b"jpeg" * 100
+    with tempfile.TemporaryFile() as tmp:
+        tmp.write(payload)
+        tmp.flush()
+        mapped = mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ)
+        frames = [
+            ({"n": 1}, "image", payload),
+            ({"n": 2}, "image", bytearray(payload)),
+            ({"n": 3}, "image", memoryview(payload)[2:]),
+            ({"n": 4}, "image", numpy.frombuffer(payload, dtype=numpy.uint8)),
+            ({"n": 5}, "image", mapped),
+        ]
+        data = b"".join(bytes(chunk) for chunk in generate_parts(frames))
+        mapped.close()
+
+    assert data.endswith(b"\r\n--myboundary--")
+
+    parts = MultipartReader().feed(data)
+    assert [body for _, body in parts] == \
+        [payload, payload, payload[2:], payload, payload]
+    assert parts[-1][0]["x-angus-parameters"] == '{"n": 5}'
+
+
+def test_generate_parts_bytes_chunks(monkeypatch):
+    monkeypatch.setattr(multipart, "BYTES_CHUNKS", True)
+    frames = [({"n": 1}, "image", bytearray(b"jpeg")),
+              ({"n": 2}, "image", memoryview(b"jpeg"))]
+    chunks = list(generate_parts(frames))
+    assert all(isinstance(chunk, bytes) for chunk in chunks)
+    assert [body for _, body in MultipartReader().feed(b"".join(chunks))] == \
+        [b"jpeg", b"jpeg"]
+
+
+def test_encoder_matches_requests():
+    content = b"\x00\xff" * 100000
+    with tempfile.TemporaryFile() as audio:
+        audio.write(content)
+        audio.seek(0)
+        fields = [("attachment://a", ("a", audio, "application/octet-stream")),
+                  ("attachment://b", ("b", io.BytesIO(b"image"), None)),
+                  ("meta", (None, '{"session": 1}', "application/json"))]
+        request = requests.Request("POST", "http://localhost/", files=fields)
+        expected = request.prepare().body
+        boundary = expected[2:expected.index(b"\r\n")]
+        expected = expected.replace(boundary, b"test")
+
+        audio.seek(0)
+        fields[1][1][1].seek(0)
+        encoder = MultipartEncoder(fields, boundary="test")
+
+        assert len(encoder) == len(expected)
+        assert b"".join(encoder) == expected
+
+        assert encoder.rewind()
+        assert encoder.read(10) + encoder.read() == expected
+
+
+def test_encoder_empty_files():
+    with tempfile.TemporaryFile() as empty:
+        fields = [("attachment://a", ("a", empty, None)),
+                  ("attachment://b", ("b", io.BytesIO(b""), None)),
+                  ("meta", (None, '{"session": 1}', "application/json"))]
+        request = requests.Request("POST", "http://localhost/", files=fields)
+        expected = request.prepare().body
+        boundary = expected[2:expected.index(b"\r\n")]
+        expected = expected.replace(boundary, b"test")
+
+        encoder = MultipartEncoder(fields, boundary="test")
+        assert len(encoder) == len(expected)
+        assert b"".join(encoder) == expected
+
+
+def test_encoder_streams():
+    with tempfile.TemporaryFile() as audio:
+        audio.write(b"x" * 1000000)
+        audio.seek(0)
+        encoder = MultipartEncoder([("sound", ("sound", audio, None))])
+        request = requests.Request(
+            "POST", "http://localhost/", data=encoder,
+            headers={"content-type": encoder.content_type}).prepare()
+        assert request.body is encoder
+        assert request.headers["Content-Length"] == str(len(encoder))
+        assert "Transfer-Encoding" not in request.headers
+        encoder.read(100)
+        assert audio.tell() < 1000
+
+
+def test_mapped_file():
+    with tempfile.NamedTemporaryFile() as sound:
+        sound.write(b"RIFF" * 10000)
+        sound.flush()
+        attachments = []
+        with rest.MappedFile(sound.name) as mapped:
+            data = json.dumps({"sound": mapped},
+                              cls=rest.generate_encoder(attachments))
+            field, (_, content, _) = attachments[0]
+            assert field in data
+            assert not isinstance(content, bytes)
+            encoder = MultipartEncoder(attachments)
+            assert (b"RIFF" * 10000) in encoder.read()
+            del content
+        assert mapped.map is None
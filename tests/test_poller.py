@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import concurrent.futures
+import json
+
+import pytest
+
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+class FakeResponse(object):
+
+    def __init__(self, representation):
+        self.representation = representation
+
+    def raise_for_status(self):
+        pass
+
+    @property
+    def content(self):
+        return json.dumps(self.representation).encode("utf-8")
+
+
+class FakeConfiguration(object):
+    """Jobs complete after a number of fetches.
+    """
+
+    def __init__(self, fetches):
+        self.fetches = fetches
+        self.calls = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(4)
+        self.poller = rest.JobPoller(self, delay=0.01, max_delay=0.05)
+
+    def fetch(self, url):
+        count = self.calls.get(url, 0) + 1
+        self.calls[url] = count
+        if url.endswith("broken"):
+            raise IOError("connection reset")
+        status = 201 if count >= self.fetches else 202
+        return FakeResponse({'status': status, 'url': url})
+
+    def get(self, url):
+        return self.executor.submit(self.fetch, url)
+
+
+def make_job(conf, name):
+    return rest.Job("http://localhost/jobs", name,
+                    representation={'status': rest.Resource.ACCEPTED},
+                    conf=conf)
+
+
+def test_wait():
+    conf = FakeConfiguration(fetches=3)
+    jobs = [make_job(conf, str(i)) for i in range(50)]
+    futures = [job.done_future() for job in jobs]
+    for job in jobs:
+        assert job.wait(timeout=5) is job
+        assert job.status == rest.Resource.CREATED
+    assert all(future.done() for future in futures)
+    assert len(conf.poller) == 0
+    assert set(conf.calls.values()) == set([3])
+
+
+def test_completed_job():
+    conf = FakeConfiguration(fetches=1)
+    job = rest.Job("http://localhost/jobs", "done",
+                   representation={'status': rest.Resource.CREATED},
+                   conf=conf)
+    assert job.wait() is job
+    assert not conf.calls
+
+
+def test_timeout_and_error():
+    conf = FakeConfiguration(fetches=1000)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        make_job(conf, "slow").wait(timeout=0.1)
+
+    with pytest.raises(IOError):
+        make_job(conf, "broken").wait(timeout=5)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import concurrent.futures
+import threading
+import time
+
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+class FakeService(rest.Service):
+    """Answer parameters['value'] after parameters['delay'] seconds.
+    """
+
+    def __init__(self):
+        super(FakeService, self).__init__(None, "http://localhost/fake")
+        self.executor = concurrent.futures.ThreadPoolExecutor(10)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def run(self, parameters):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(parameters['delay'])
+        with self.lock:
+            self.in_flight -= 1
+        if parameters['value'] is None:
+            raise ValueError("bad image")
+        return parameters['value']
+
+    def process_async(self, parameters=None, session=None, **kwargs):
+        return self.executor.submit(self.run, parameters)
+
+
+def test_ordered():
+    service = FakeService()
+    items = [{'value': i, 'delay': 0.01 * (5 - i % 5)} for i in range(20)]
+    results = list(service.process_many(items, concurrency=3))
+    assert [r.job for r in results] == list(range(20))
+    assert [r.index for r in results] == list(range(20))
+    assert service.max_in_flight == 3
+
+
+def test_unordered_with_errors():
+    service = FakeService()
+    items = [{'value': 0, 'delay': 0.2},
+             {'value': None, 'delay': 0.01},
+             {'value': 2, 'delay': 0.01}]
+    results = list(service.process_many(items, concurrency=3, ordered=False))
+    assert results[-1].job == 0
+    errors = [r for r in results if r.error is not None]
+    assert len(errors) == 1
+    assert errors[0].index == 1
+    assert errors[0].parameters is items[1]
+
+
+def test_lazy():
+    service = FakeService()
+
+    def items():
+        for i in range(100):
+            yield {'value': i, 'delay': 0}
+
+    results = service.process_many(items(), concurrency=2)
+    assert next(results).job == 0
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from angus.client import rest
+from angus.client import results
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+ENDPOINT = "https://gate.angus.ai/services/age_and_gender_estimation/1/jobs"
+
+
+def make_representation(faces):
+    return {
+        "url": ENDPOINT + "/1",
+        "status": 201,
+        "input_size": [640, 480],
+        "nb_faces": faces,
+        "faces": [{"roi": [i, 2 * i, 30, 40], "roi_confidence": 0.5,
+                   "age": 20 + i, "age_confidence": 0.7,
+                   "gender": "male" if i % 2 else "female",
+                   "gender_confidence": 0.9} for i in range(faces)],
+    }
+
+
+def test_typed_job():
+    job = rest.Job(ENDPOINT, "1", representation=make_representation(2))
+    result = job.typed()
+    assert isinstance(result, results.AgeGenderResult)
+    assert result.input_size == (640, 480)
+    face = result.faces[1]
+    assert face.roi == (1, 2, 30, 40)
+    assert face.gender == "male"
+    assert face.as_dict()["age"] == 21
+    assert not hasattr(face, "__dict__")
+    assert len(result) == 2
+
+    with pytest.raises(ValueError):
+        rest.Job("http://localhost/jobs", "1",
+                 representation=make_representation(1)).typed()
+
+
+def test_batch():
+    batch = results.AgeGenderResult.batch(
+        results.AgeGenderResult(make_representation(n)) for n in (2, 0, 3))
+    assert len(batch) == 5
+    assert batch.boxes.shape == (5, 4)
+    assert batch.boxes.flags["C_CONTIGUOUS"]
+    assert batch.boxes.dtype == numpy.float32
+    assert list(batch.frames) == [0, 0, 2, 2, 2]
+    assert list(batch.ages) == [20, 21, 20, 21, 22]
+    assert list(batch.genders[:2]) == ["female", "male"]
+    with pytest.raises(AttributeError):
+        batch.gaze_angles
+
+
+def test_missing_values():
+    gaze = results.GazeResult({"faces": [
+        {"roi": [1, 2, 3, 4], "eye_left": [5, 6], "head_yaw": 0.5}]})
+    batch = results.GazeResult.batch([gaze])
+    assert batch.eyes.shape == (1, 2, 2)
+    assert numpy.isnan(batch.eyes[0, 1]).all()
+    assert list(batch.eyes[0, 0]) == [5, 6]
+    assert batch.head_angles[0, 0] == 0.5
+    assert numpy.isnan(batch.scores[0])
+    empty = results.FaceDetectionResult.batch([])
+    assert empty.boxes.shape == (0, 4)
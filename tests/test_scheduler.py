@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import threading
+
+import pytest
+
+from angus.client import scheduler
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+def run_order(strict, lanes=scheduler.LANES):
+    """Queue 10 tasks per lane behind a blocked single worker and return
+    the lanes in execution order.
+    """
+    executor = scheduler.PriorityExecutor(1, lanes, strict)
+    started = threading.Event()
+    gate = threading.Event()
+    order = []
+    executor.submit(lambda: started.set() or gate.wait())
+    started.wait()
+    futures = []
+    for name in (scheduler.BULK, scheduler.NORMAL, scheduler.REALTIME):
+        with executor.lane(name):
+            for _ in range(10):
+                futures.append(executor.submit(order.append, name))
+    assert executor.pending()[scheduler.BULK] == 10
+    gate.set()
+    for future in futures:
+        future.result()
+    executor.shutdown()
+    return order
+
+
+def test_strict():
+    order = run_order(True)
+    assert order == [scheduler.REALTIME] * 10 + [scheduler.NORMAL] * 10 + \
+        [scheduler.BULK] * 10
+
+
+def test_weighted():
+    order = run_order(False)
+    first = order[:13]
+    assert first.count(scheduler.REALTIME) == 8
+    assert first.count(scheduler.NORMAL) == 4
+    assert first.count(scheduler.BULK) == 1
+
+
+def test_lanes():
+    executor = scheduler.PriorityExecutor(2)
+    assert executor.submit(lambda: 42).result() == 42
+    with pytest.raises(ValueError):
+        with executor.lane("unknown"):
+            pass
+    with executor.lane(scheduler.BULK):
+        future = executor.submit(lambda: 1 // 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result()
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+
+
+def test_timer_order():
+    timer = scheduler.Timer()
+    called = []
+    done = threading.Event()
+    timer.call_later(0.1, lambda: (called.append(2), done.set()))
+    timer.call_later(0.05, lambda: 1 / 0)
+    timer.call_later(0.01, lambda: called.append(1))
+    assert done.wait(2)
+    assert called == [1, 2]
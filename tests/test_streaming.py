@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import concurrent.futures
+import json
+import socket
+import threading
+import time
+
+import pytest
+import requests
+from six.moves import queue
+
+from angus.client import flow, multipart, multiplex, streaming
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+class FakeConfiguration(object):
+    auth = None
+    verify = True
+    timeout = 5
+
+
+class FakeService(object):
+    """Open stream jobs on a loopback server.
+    """
+
+    def __init__(self, address):
+        self.url = "http://%s:%d" % address
+
+    def open_stream(self, parameters=None, session=None):
+        job = FakeResponse()
+        job.result = {"input": self.url + "/input",
+                      "output": self.url + "/output"}
+        return job
+
+
+def read_head(sock):
+    head = b""
+    while not head.endswith(b"\r\n\r\n"):
+        head += sock.recv(1)
+    return head.decode("latin-1")
+
+
+def serve_stream(listener):
+    """Accept the two legs of a multiplexed stream and answer each frame
+    with its sequence echoed, on a chunked output.
+    """
+    legs = {}
+    for _ in range(2):
+        sock, _ = listener.accept()
+        legs[read_head(sock).split()[0]] = sock
+    input_leg, output_leg = legs["POST"], legs["GET"]
+    output_leg.sendall(b"HTTP/1.1 200 OK\r\n"
+                       b"Transfer-Encoding: chunked\r\n\r\n")
+
+    decoder = multiplex.ChunkedDecoder()
+    reader = multipart.MultipartReader()
+    separator = ""
+    while not decoder.done:
+        data = input_leg.recv(4096)
+        if not data:
+            break
+        for fragment in decoder.feed(data):
+            for headers, _ in reader.feed(fragment):
+                sequence = int(headers["x-angus-sequence"])
+                result = json.dumps({"frame": sequence}).encode()
+                part = multipart.part_header({}, "result", len(result),
+                                             sequence, separator) + result
+                separator = "\r\n"
+                size = ("%x\r\n" % len(part)).encode()
+                output_leg.sendall(size + part + b"\r\n")
+
+    output_leg.sendall(b"0\r\n\r\n")
+    input_leg.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+    input_leg.close()
+    output_leg.close()
+
+
+class FakeResponse(object):
+    """The output leg, parts are read from a queue until None.
+    """
+
+    def __init__(self, parts=None, status_code=200):
+        self.parts = parts
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        while True:
+            part = self.parts.get()
+            if part is None:
+                return
+            if isinstance(part, Exception):
+                raise part
+            yield part
+
+
+class FakeServer(object):
+    """Stand-in for the configuration of a stream: the input body posted
+    is parsed in a thread, answer(count) tells whether the count-th frame
+    received gets a result on the output, without X-Angus-Sequence. The
+    input leg fails after the drop_input-th frame, the output leg instead
+    of the result of the drop_output-th frame.
+    """
+
+    def __init__(self, answer=None, drop_input=None, drop_output=None):
+        self.answer = answer or (lambda count: True)
+        self.drop_input = drop_input
+        self.drop_output = drop_output
+        self.received = 0
+        self.outputs = 0
+        self.parts = queue.Queue()
+        self.executor = concurrent.futures.ThreadPoolExecutor(2)
+
+    def post(self, url, data=None, **kwargs):
+        return self.executor.submit(self.consume, data)
+
+    def consume(self, body):
+        reader = multipart.MultipartReader()
+        for chunk in body:
+            for _ in reader.feed(chunk):
+                self.received += 1
+                if self.received == self.drop_output:
+                    self.parts.put(requests.exceptions.ChunkedEncodingError(
+                        "Connection broken"))
+                elif self.answer(self.received):
+                    self.write({"frame": self.received})
+                if self.received == self.drop_input:
+                    return FakeResponse(status_code=502)
+        self.parts.put(None)
+        return FakeResponse()
+
+    def write(self, result):
+        result = json.dumps(result).encode()
+        self.parts.put(multipart.part_header({}, "result", len(result),
+                                             separator="\r\n") + result)
+
+    def open_output(self):
+        self.outputs += 1
+        return FakeResponse(self.parts)
+
+
+def frames(count, delay=0):
+    for i in range(count):
+        time.sleep(delay)
+        yield {"frame": i}, "image", b"jpeg"
+
+
+def collect(stream, timeout=5):
+    """Read all the results of a stream, failing instead of hanging.
+    """
+    results = []
+    reader = threading.Thread(target=lambda: results.extend(stream))
+    reader.daemon = True
+    reader.start()
+    reader.join(timeout)
+    assert not reader.is_alive(), "stream stalled"
+    return results
+
+
+def test_tracker_in_order():
+    tracker = streaming.FrameTracker()
+    assert tracker.sent({"frame": 1}) == 1
+    assert tracker.sent({"frame": 2}) == 2
+
+    result = tracker.received(b'{"a": 1}', {})
+    assert result == b'{"a": 1}'
+    assert result.json() == {"a": 1}
+    assert result.sequence == 1
+    assert result.parameters == {"frame": 1}
+    assert result.latency >= 0
+    assert len(tracker) == 1
+
+
+def test_tracker_skipped():
+    tracker = streaming.FrameTracker()
+    for i in range(4):
+        tracker.sent({"frame": i})
+
+    result = tracker.received(b"{}", {"x-angus-sequence": "3"})
+    assert result.sequence == 3
+    assert result.skipped == (1, 2)
+    assert tracker.skipped == 2
+    assert tracker.reset() == 1
+
+
+def test_results_in_one_read():
+    server = FakeServer()
+    stream = streaming.Stream(server, "input", "output", None, window=4)
+    stream.open_output = server.open_output
+    for i in range(4):
+        stream.tracker.sent({"frame": i})
+        stream.window.put(i)
+        stream.window.get()
+
+    chunk = b""
+    for sequence in (1, 2, 3):
+        result = json.dumps({"frame": sequence}).encode()
+        chunk += multipart.part_header({}, "result", len(result), sequence,
+                                       "\r\n") + result
+    server.parts.put(chunk)
+    server.parts.put(None)
+
+    results = list(stream._read_output())
+    assert [result.sequence for result in results] == [1, 2, 3]
+    assert [result.skipped for result in results] == [(), (), ()]
+    assert all(result.latency is not None for result in results)
+    assert stream.window.in_flight == 1
+
+
+def test_histogram():
+    histogram = streaming.LatencyHistogram(size=4, buckets=(0.1, 1.0))
+    for latency in [5.0, 0.05, 0.5, 0.5, 2.0]:
+        histogram.add(latency)
+
+    assert len(histogram) == 4
+    assert histogram.counts() == [(0.1, 1), (1.0, 2), (None, 1)]
+    assert histogram.percentile(50) == 0.5
+    assert histogram.percentile(100) == 2.0
+    assert histogram.mean() == 0.7625
+
+
+def test_chunked_decoder():
+    data = b"5\r\nhello\r\n7;ext=1\r\n, world\r\n0\r\n\r\n"
+    for size in [1, 4, 100]:
+        decoder = multiplex.ChunkedDecoder()
+        body = b""
+        for i in range(0, len(data), size):
+            body += b"".join(decoder.feed(data[i:i+size]))
+        assert body == b"hello, world"
+        assert decoder.done
+
+
+@pytest.mark.parametrize("policy", [flow.BLOCK, flow.DROP_OLDEST])
+def test_skipped_frames_expire(policy):
+    # Every other frame is skipped and their sequence never echoed
+    server = FakeServer(lambda count: count % 2)
+    stream = streaming.Stream(server, "input", "output",
+                              frames(10, delay=0.05), window=2,
+                              policy=policy, frame_timeout=0.2)
+    stream.open_output = server.open_output
+
+    results = collect(stream)
+    assert stream.window.expired > 0
+    assert stream.dropped < 5
+    assert len(results) == server.received // 2 + server.received % 2
+    assert [result.json() for result in results] == \
+        [{"frame": count} for count in range(1, server.received + 1, 2)]
+
+
+def test_frame_timeout_follows_latency():
+    histogram = streaming.LatencyHistogram()
+    assert histogram.frame_timeout() == streaming.FRAME_TIMEOUT
+    for _ in range(streaming.MIN_TIMEOUT_SAMPLES):
+        histogram.add(0.5)
+    assert histogram.frame_timeout() == 0.5 * streaming.FRAME_TIMEOUT_FACTOR
+
+    histogram = streaming.LatencyHistogram()
+    for _ in range(streaming.MIN_TIMEOUT_SAMPLES):
+        histogram.add(0.001)
+    assert histogram.frame_timeout() == streaming.MIN_FRAME_TIMEOUT
+
+
+def test_multiplexer_loopback():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(2)
+    server = threading.Thread(target=serve_stream, args=(listener,))
+    server.daemon = True
+    server.start()
+
+    multiplexer = multiplex.StreamMultiplexer(FakeConfiguration())
+    try:
+        stream = multiplexer.open(FakeService(listener.getsockname()),
+                                  window=8, policy=flow.BLOCK)
+        for i in range(5):
+            assert stream.send({"frame": i}, "image", b"x" * 100000)
+        stream.close()
+
+        results = collect(stream)
+        assert stream.error is None
+        assert [result.sequence for result in results] == [1, 2, 3, 4, 5]
+        assert [result.parameters for result in results] == \
+            [{"frame": i} for i in range(5)]
+        assert results[-1].json() == {"frame": 5}
+        assert len(stream.latency) == 5
+    finally:
+        multiplexer.stop()
+        listener.close()
+
+
+def test_multiplexer_failure_ends_streams(monkeypatch):
+    def fail(readers, writers, timeout):
+        raise ValueError("filedescriptor out of range in select()")
+
+    monkeypatch.setattr(multiplex, "wait", fail)
+    multiplexer = multiplex.StreamMultiplexer(FakeConfiguration())
+    stream = multiplex.MultiplexedStream(multiplexer, "input", "output")
+    multiplexer._added.append(stream)
+    multiplexer.start()
+
+    assert stream.get(timeout=5) is None
+    assert "out of range" in stream.error
+    assert not multiplexer._running
+    multiplexer.stop()
+    assert multiplexer._wake_send is None
+
+
+def test_multiplexed_results_in_one_read():
+    multiplexer = multiplex.StreamMultiplexer(FakeConfiguration())
+    stream = multiplex.MultiplexedStream(multiplexer, "input", "output")
+    for i in range(4):
+        stream.tracker.sent({"frame": i})
+        stream.window.put(i)
+        stream.window.poll()
+
+    data = b"HTTP/1.1 200 OK\r\n\r\n"
+    for sequence in (1, 2, 3):
+        result = json.dumps({"frame": sequence}).encode()
+        data += multipart.part_header({}, "result", len(result), sequence,
+                                      "\r\n") + result
+    stream._parse(data)
+
+    results = [stream.get(timeout=1) for _ in range(3)]
+    assert [result.sequence for result in results] == [1, 2, 3]
+    assert all(result.latency is not None for result in results)
+    assert stream.window.in_flight == 1
+
+
+def test_multiplexer_closes_wake_sockets():
+    multiplexer = multiplex.StreamMultiplexer(FakeConfiguration())
+    multiplexer.start()
+    sockets = (multiplexer._wake_recv, multiplexer._wake_send)
+    multiplexer.stop()
+    for sock in sockets:
+        with pytest.raises(socket.error):
+            sock.send(b"\0")
+
+    # Started again with a new pair
+    multiplexer.start()
+    assert multiplexer._wake_send.send(b"\0") == 1
+    multiplexer.stop()
+
+
+def test_wait():
+    left, right = socket.socketpair()
+    try:
+        assert multiplex.wait([left], [], 0) == (set(), set())
+        right.send(b"x")
+        assert multiplex.wait([left], [right], 1) == ({left}, {right})
+    finally:
+        left.close()
+        right.close()
+
+
+def test_resilient_output():
+    server = FakeServer(drop_output=3)
+    stream = streaming.Stream(server, "input", "output", frames(8, 0.05),
+                              reconnect=2, backoff=0.01)
+    stream.open_output = server.open_output
+
+    results = collect(stream)
+    assert server.outputs == 2
+    assert stream.reconnections == 1
+    assert stream.lost == 1
+    assert [result.json()["frame"] for result in results] == \
+        [1, 2, 4, 5, 6, 7, 8]
+    assert [result.parameters for result in results][-1] == {"frame": 7}
+
+
+def test_resilient_input():
+    server = FakeServer(drop_input=3)
+    stream = streaming.Stream(server, "input", "output", frames(8, 0.05),
+                              reconnect=2, backoff=0.01)
+    stream.open_output = server.open_output
+
+    results = collect(stream)
+    assert server.received == 8
+    assert stream.reconnections == 1
+    assert [result.json()["frame"] for result in results] == \
+        list(range(1, 9))
+    assert results[-1].parameters == {"frame": 7}
+
+
+def test_resilient_gives_up():
+    server = FakeServer()
+    for _ in range(3):
+        server.parts.put(requests.exceptions.ConnectionError("refused"))
+    stream = streaming.Stream(server, "input", "output", frames(8, 0.05),
+                              reconnect=2, backoff=0.01)
+    stream.open_output = server.open_output
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        list(stream)
+    assert server.outputs == 3
+    assert stream.reconnections == 2
@@ -17,8 +17,6 @@
 # specific language governing permissions and limitations
 # under the License.
 
-import time
-
 import pytest
 
 import angus.client
@@ -69,8 +67,7 @@ def check_result_res_eventually(result_res, howmany=1):
     isinstance(result_res, Resource)
 
     if result_res.status == Resource.ACCEPTED:
-        time.sleep(10)
-        result_res.fetch()
+        result_res.wait(timeout=10)
 
     check_result_res(result_res, howmany)
 
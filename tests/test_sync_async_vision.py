@@ -19,7 +19,6 @@
 
 import datetime
 import io
-import time
 
 import pytest
 
@@ -90,8 +89,7 @@ def check_result_res_eventually(result_res, howmany=1):
     isinstance(result_res, Resource)
 
     if result_res.status == Resource.ACCEPTED:
-        time.sleep(10)
-        result_res.fetch()
+        result_res.wait(timeout=10)
 
     check_result_res(result_res, howmany)
 
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import csv
+import io
+import os
+import tempfile
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from angus.client import rest
+from angus.client import streaming
+from angus.client import table
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+FACE = {"roi": [1, 2, 30, 40], "roi_confidence": 0.5, "age": 32,
+        "age_confidence": 0.7, "gender": "female", "gender_confidence": 0.9}
+
+
+def make_table():
+    results = table.ResultTable()
+    job = rest.Job("http://localhost/jobs", "1",
+                   representation={"faces": [FACE, {"roi": [5, 6, 7, 8]}]})
+    results.add(job, timestamp=10.0, session_id="s1")
+    results.add({"faces": []}, timestamp=11.0)
+    part = streaming.StreamResult(b'{"faces": [{"age": 40}]}')
+    part.sent_at = 12.0
+    results.add_all([rest.ProcessResult(0, {}, part, None),
+                     rest.ProcessResult(1, {}, None, ValueError())])
+    return results
+
+
+def test_numpy():
+    results = make_table()
+    assert len(results) == 4
+    arrays = results.to_numpy()
+    assert list(arrays["timestamp"]) == [10.0, 10.0, 11.0, 12.0]
+    assert list(arrays["face"]) == [0, 1, -1, 0]
+    assert arrays["bbox"].shape == (4, 4)
+    assert list(arrays["bbox"][1]) == [5, 6, 7, 8]
+    assert numpy.isnan(arrays["age"][1])
+    assert arrays["age"][3] == 40
+    assert list(arrays["session_id"]) == ["s1", "s1", None, None]
+
+    # Exported arrays are views, growing the table leaves them unchanged
+    results.add({"faces": [FACE]})
+    assert len(arrays["age"]) == 4
+    assert len(results.to_numpy()["age"]) == 5
+
+
+def test_arrow():
+    pyarrow = pytest.importorskip("pyarrow")
+    arrow = make_table().to_arrow()
+    assert arrow.num_rows == 4
+    assert arrow.column("bbox").type == pyarrow.list_(pyarrow.float32(), 4)
+    assert arrow.column("gender").to_pylist()[0] == "female"
+
+    path = os.path.join(tempfile.mkdtemp(), "results.parquet")
+    make_table().to_parquet(path)
+    assert pyarrow.parquet.read_table(path).num_rows == 4
+
+
+def test_csv():
+    path = os.path.join(tempfile.mkdtemp(), "results.csv")
+    make_table().to_csv(path)
+    with io.open(path, newline="") as output:
+        rows = list(csv.reader(output))
+    assert rows[0][:7] == ["timestamp", "session_id", "face", "bbox_0",
+                           "bbox_1", "bbox_2", "bbox_3"]
+    assert len(rows) == 5
+    assert rows[1][rows[0].index("gender")] == "female"
+
+
+def test_invalid_value_adds_nothing():
+    results = make_table()
+    with pytest.raises(ValueError):
+        results.add({"faces": [FACE]}, timestamp="2017-08-23T10:00:00")
+    with pytest.raises(ValueError):
+        results.add({"faces": [FACE, dict(FACE, age="unknown")]})
+
+    arrays = results.to_numpy()
+    assert len(results) == 4
+    assert all(len(column) == 4 for column in arrays.values())
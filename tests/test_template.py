@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+
+import io
+import json
+
+import pytest
+
+from angus.client import rest
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+
+def make_service():
+    service = rest.Service(None, "http://localhost/fake",
+                           conf=rest.Configuration())
+    service.session_parameters = {"lang": "en"}
+    service.default_session = rest.Session(service)
+    return service
+
+
+def test_render():
+    service = make_service()
+    reference = io.BytesIO(b"reference")
+    template = service.prepare({"sensitivity": 0.7, "reference": reference})
+
+    image = io.BytesIO(b"image")
+    data, attachments, restore = template.render(
+        {"image": image, "timestamp": 12.5, "zone": [1, 2]})
+    data = json.loads(data)
+
+    assert data["sensitivity"] == 0.7
+    assert data["lang"] == "en"
+    assert data["state"] == service.default_session.state()
+    assert data["timestamp"] == 12.5
+    assert data["zone"] == [1, 2]
+    assert restore is None
+
+    contents = dict((field, content)
+                    for field, (_, content, _) in attachments)
+    assert contents[data["reference"]] == b"reference"
+    assert contents[data["image"]] is image
+
+    # The fixed attachments are sent again with the next job
+    data, attachments, _ = template.render({"image": io.BytesIO(b"next")})
+    assert len(attachments) == 2
+    assert json.loads(data)["reference"] in dict(attachments)
+
+
+def test_fixed_fields():
+    template = make_service().prepare({"sensitivity": 0.7})
+    with pytest.raises(ValueError):
+        template.render({"sensitivity": 0.5})
+
+
+def test_process():
+    service = make_service()
+    sent = []
+    service.jobs.send = lambda encoded, **kwargs: sent.append(
+        (encoded, kwargs))
+    template = service.prepare({}, priority="bulk")
+    template.process({"image": io.BytesIO(b"image")}, timestamp=1)
+    (data, attachments, _), kwargs = sent[0]
+    assert set(["lang", "state", "image", "timestamp"]) < set(
+        json.loads(data))
+    assert kwargs["priority"] == "bulk"
+    assert kwargs["resource_type"] is rest.Job
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import concurrent.futures
+import io
+import time
+
+import pytest
+import requests
+
+from angus.client import rest, transport
+
+__updated__ = "2026-10-18"
+__author__ = "Aurélien Moreau"
+__copyright__ = "Copyright 2015-2017, Angus.ai"
+__credits__ = ["Aurélien Moreau", "Gwennael Gate"]
+__license__ = "Apache v2.0"
+__maintainer__ = "Aurélien Moreau"
+__status__ = "Production"
+
+URL = "https://gate.angus.ai/services/face_detection/1/jobs"
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def close(self):
+        pass
+
+
+class FakeSend(object):
+    """Fail with the given outcomes then succeed.
+    """
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, request, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def prepare(method, url=URL, data=None, headers=None):
+    return requests.Request(method, url, data=data, headers=headers).prepare()
+
+
+def reset():
+    return requests.exceptions.ConnectionError("connection reset")
+
+
+def test_retry_idempotent():
+    retry = transport.RetryPolicy(retries=3, backoff=0)
+    send = FakeSend([reset(), 503, reset()])
+    response = transport.send(send, prepare("GET"), retry)
+    assert response.status_code == 200
+    assert send.calls == 4
+
+
+def test_retry_exhausted():
+    retry = transport.RetryPolicy(retries=2, backoff=0)
+    send = FakeSend([503, 503, 503, 503])
+    assert transport.send(send, prepare("GET"), retry).status_code == 503
+    assert send.calls == 3
+
+
+def test_post_not_retried():
+    retry = transport.RetryPolicy(retries=3, backoff=0)
+    send = FakeSend([reset()])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.send(send, prepare("POST", data="{}"), retry)
+    assert send.calls == 1
+
+    send = FakeSend([requests.exceptions.ConnectTimeout("not sent")])
+    transport.send(send, prepare("POST", data="{}"), retry)
+    assert send.calls == 2
+
+    send = FakeSend([503])
+    headers = {"X-Angus-Idempotent": "true"}
+    transport.send(send, prepare("POST", data="{}", headers=headers), retry)
+    assert send.calls == 2
+
+
+def test_stream_not_retried():
+    retry = transport.RetryPolicy(retries=3, backoff=0)
+    send = FakeSend([503])
+    request = prepare("PUT", data=iter([b"frame"]))
+    assert transport.send(send, request, retry).status_code == 503
+
+
+def test_circuit_breaker():
+    changes = []
+    breakers = transport.CircuitBreakers(
+        threshold=2, reset_timeout=0,
+        listener=lambda *change: changes.append(change))
+    send = FakeSend([500, reset(), 200])
+
+    transport.send(send, prepare("GET", URL + "/0123456789ab"),
+                   breakers=breakers)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.send(send, prepare("GET", URL + "/ba9876543210"),
+                       breakers=breakers)
+    name = URL + "/*"
+    assert breakers.states() == {name: transport.OPEN}
+
+    # reset_timeout elapsed, the probe closes the circuit
+    transport.send(send, prepare("GET", URL + "/0123456789ab"),
+                   breakers=breakers)
+    assert breakers.states() == {name: transport.CLOSED}
+    assert [change[2] for change in changes] == [
+        transport.OPEN, transport.HALF_OPEN, transport.CLOSED]
+
+
+def test_circuit_open_fails_fast():
+    breakers = transport.CircuitBreakers(threshold=1, reset_timeout=60)
+    send = FakeSend([503])
+    transport.send(send, prepare("GET"), breakers=breakers)
+    with pytest.raises(transport.CircuitOpenError):
+        transport.send(send, prepare("GET"), breakers=breakers)
+    assert send.calls == 1
+
+
+class SlowResponse(FakeResponse):
+
+    def __init__(self, delay):
+        super(SlowResponse, self).__init__(200)
+        self.delay = delay
+        self.closed = False
+        time.sleep(delay)
+
+    def close(self):
+        self.closed = True
+
+
+def test_hedging():
+    executor = concurrent.futures.ThreadPoolExecutor(4)
+    hedging = transport.Hedging(percentile=90, max_ratio=0.5, min_samples=5)
+    delays = [0.01] * 5 + [0.5, 0.01]
+
+    def send():
+        return executor.submit(SlowResponse, delays.pop(0))
+
+    for _ in range(5):
+        hedging.call(send)
+    assert hedging.fired == 0
+    assert hedging.threshold() < 0.25
+
+    start = time.time()
+    response = hedging.call(send)
+    assert response.delay == 0.01
+    assert time.time() - start < 0.4
+    assert hedging.fired == 1
+    assert hedging.won == 1
+
+
+def test_hedging_buffers_when_possible():
+    conf = rest.Configuration()
+    conf.set_hedging(max_ratio=0.5, min_samples=2)
+    collection = rest.Collection(None, "http://localhost/fake", conf=conf)
+    sent = []
+
+    def post(data, attachments, priority=None):
+        sent.append(attachments[0][1][1])
+        response = FakeResponse(201)
+        response.content = b'{"url": "http://localhost/fake/1"}'
+        response.raise_for_status = lambda: None
+        future = concurrent.futures.Future()
+        future.set_result(response)
+        return future
+
+    collection.post = post
+    image = io.BytesIO(b"image")
+    encoded = ("{}", [("image", ("image", image, None))], None)
+    for _ in range(3):
+        collection.send(encoded, hedge=True)
+    # Buffered only once enough latencies are known to hedge
+    assert sent == [image, image, b"image"]
+
+    # Nor when the ratio of duplicates is reached
+    conf.hedging.fired = conf.hedging.requests
+    collection.send(encoded, hedge=True)
+    assert sent[3] is image
+
+
+def test_hedging_ratio():
+    executor = concurrent.futures.ThreadPoolExecutor(4)
+    hedging = transport.Hedging(max_ratio=0.1, min_samples=1)
+    hedging.latencies.append(0.001)
+
+    def send():
+        return executor.submit(SlowResponse, 0.02)
+
+    for _ in range(20):
+        hedging.call(send)
+    assert hedging.fired <= 2
+
+
+def test_admission_queue():
+    admission = transport.AdmissionController(max_queue=1,
+                                              policy=transport.RAISE)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def work(delay):
+        admission.started()
+        try:
+            time.sleep(delay)
+        finally:
+            admission.finished()
+
+    first = admission.submit(lambda: executor.submit(work, 0.3))
+    while admission.in_flight == 0:
+        time.sleep(0.01)
+    second = admission.submit(lambda: executor.submit(work, 0))
+    assert admission.queue_depth == 1
+    with pytest.raises(transport.Overloaded):
+        admission.submit(lambda: executor.submit(work, 0))
+    assert admission.rejected == 1
+
+    admission.configure(max_queue=1, policy=transport.SHED)
+    third = admission.submit(lambda: executor.submit(work, 0))
+    assert second.cancelled()
+    assert admission.shed == 1
+    third.result()
+    first.result()
+    assert admission.queue_depth == 0
+    assert admission.in_flight == 0
+    executor.shutdown()
+
+
+def test_admission_rate():
+    admission = transport.AdmissionController(rate=20, burst=1)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    start = time.time()
+    for _ in range(5):
+        admission.submit(lambda: executor.submit(lambda: None))
+    assert time.time() - start >= 0.15
+
+    admission.configure(rate=1, burst=1, policy=transport.RAISE)
+    admission.submit(lambda: executor.submit(lambda: None))
+    with pytest.raises(transport.Overloaded):
+        admission.submit(lambda: executor.submit(lambda: None))
+    executor.shutdown()